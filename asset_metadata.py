@@ -3,32 +3,140 @@
 Заменяет legacy клиент для получения asset_meta
 """
 
+import os
 import time
-from typing import Dict, Any
-from hyperliquid.info import Info
-from hyperliquid.utils.constants import MAINNET_API_URL
+from dataclasses import dataclass
+from functools import cache, lru_cache
+from typing import Dict, Any, Tuple
+
+import numpy as np
+import json_utils
 from logger_config import setup_unified_logger
 
+# Значения по умолчанию для параметров активов — создаются один раз на импорт,
+# а не на каждый актив при каждом refresh
+_DEFAULT_SZ_DECIMALS = 6
+_DEFAULT_SZ_STEP = 0.000001
+_DEFAULT_MAX_LEVERAGE = 50
+
+# Дисковый кэш метаданных: свежий срез переживает рестарт процесса —
+# старт без лишнего round-trip к meta-эндпоинту
+_META_CACHE_FILE = 'asset_meta_cache.json'
+_META_CACHE_TTL = 86400  # Сутки; universe меняется редко
+
+
+@cache
+def _hyperliquid_sdk():
+    """Ленивая загрузка Hyperliquid SDK — не тянем его в процессы,
+    которые метаданными не пользуются (например, валидация конфига)"""
+    from hyperliquid.info import Info
+    from hyperliquid.utils.constants import MAINNET_API_URL
+    return Info, MAINNET_API_URL
+
+
+@dataclass(frozen=True, slots=True)
+class AssetRow:
+    """Параметры одного актива единым неизменяемым срезом"""
+    szDecimals: int
+    szStep: str
+    maxLeverage: int
+    onlyIsolated: bool
+
 
 class AssetMetadataProvider:
     """Провайдер метаданных активов"""
 
     def __init__(self):
         self.logger = setup_unified_logger("asset_metadata")
-        self.info = Info(MAINNET_API_URL, skip_ws=True)
+        Info, api_url = _hyperliquid_sdk()
+        self.info = Info(api_url, skip_ws=True)
         self._cache = {}
-        self._cache_timestamp = 0
+        self._cache_expires_at = 0.0  # Момент истечения кэша по монотонным часам
         self._cache_ttl = 300  # 5 минут
+        self._generation = 0  # Счетчик поколений кэша для мемоизации accessors
+        self._snapshot: Dict[str, AssetRow] = {}  # Срез параметров по активам, собирается при refresh
+
+        # SoA-представление метаданных: плотные массивы + отображение символ→индекс,
+        # чтобы горячие выборки были индексированием массива, а не цепочкой dict.get
+        self._idx: Dict[str, int] = {}
+        self._sz_dec = np.array([], dtype=np.int8)
+        self._sz_step = np.array([], dtype=np.float64)
+        self._max_lev = np.array([], dtype=np.int16)
+        self._only_isolated = np.array([], dtype=np.bool_)
+
+    def _load_disk_cache(self) -> Dict[str, dict]:
+        """Метаданные с диска, если срез моложе суток; иначе пустой dict"""
+        try:
+            if time.time() - os.path.getmtime(_META_CACHE_FILE) > _META_CACHE_TTL:
+                return {}
+            data = json_utils.load_file(_META_CACHE_FILE)
+            if not isinstance(data, dict):
+                return {}
+            # Проверяем форму записей: схема файла могла уехать между версиями
+            for info in data.values():
+                if not isinstance(info, dict) or 'szDecimals' not in info:
+                    return {}
+            return data
+        except (FileNotFoundError, OSError):
+            return {}
+        except Exception as e:
+            self.logger.warning("Failed to read meta disk cache: %s", e)
+            return {}
+
+    def _store_disk_cache(self, asset_meta: Dict[str, dict]) -> None:
+        """Сохранение среза метаданных на диск (best-effort)"""
+        try:
+            json_utils.dump_file(asset_meta, _META_CACHE_FILE, indent=False, atomic=True)
+        except Exception as e:
+            self.logger.warning("Failed to write meta disk cache: %s", e)
+
+    def _install_meta(self, asset_meta: Dict[str, dict]) -> None:
+        """Публикация среза метаданных: dict-кэш, snapshot и SoA-массивы"""
+        self._cache = asset_meta
+        self._snapshot = {
+            name: AssetRow(
+                szDecimals=info['szDecimals'],
+                szStep=info['szStep'],
+                maxLeverage=info['maxLeverage'],
+                onlyIsolated=info['onlyIsolated']
+            )
+            for name, info in asset_meta.items()
+        }
+        # Перестраиваем SoA-массивы одним проходом
+        self._idx = {name: i for i, name in enumerate(asset_meta)}
+        self._sz_dec = np.fromiter(
+            (info['szDecimals'] for info in asset_meta.values()), dtype=np.int8, count=len(asset_meta))
+        self._sz_step = np.fromiter(
+            (float(info['szStep']) for info in asset_meta.values()), dtype=np.float64, count=len(asset_meta))
+        self._max_lev = np.fromiter(
+            (info['maxLeverage'] for info in asset_meta.values()), dtype=np.int16, count=len(asset_meta))
+        self._only_isolated = np.fromiter(
+            (info['onlyIsolated'] for info in asset_meta.values()), dtype=np.bool_, count=len(asset_meta))
+
+        self._cache_expires_at = time.monotonic() + self._cache_ttl
+        self._generation += 1
 
     def get_asset_meta(self, force_refresh: bool = False) -> Dict[str, dict]:
         """Получение метаданных активов с кэшированием"""
-        current_time = time.time()
-
-        # Проверяем кэш
-        if not force_refresh and self._cache and (current_time - self._cache_timestamp) < self._cache_ttl:
+        # Проверяем кэш (монотонные часы устойчивы к переводу системного времени)
+        if not force_refresh and self._cache and time.monotonic() < self._cache_expires_at:
             self.logger.debug("Using cached asset metadata")
             return self._cache
 
+        # Холодный старт: свежий дисковый срез избавляет от round-trip.
+        # Кэш best-effort: битый или устаревший по схеме файл не должен
+        # ронять старт — при любой ошибке падаем на сетевой фетч
+        if not force_refresh and not self._cache:
+            cached = self._load_disk_cache()
+            if cached:
+                try:
+                    self._install_meta(cached)
+                    self.logger.info("Asset metadata loaded from disk cache: %d assets", len(cached))
+                    return cached
+                except Exception as e:
+                    self.logger.warning("Corrupt meta disk cache ignored: %s", e)
+                    self._cache = {}
+
         try:
             self.logger.info("Fetching fresh asset metadata")
 
@@ -47,51 +155,71 @@ class AssetMetadataProvider:
                 name = asset_info.get('name')
                 if name:
                     asset_meta[name] = {
-                        'szDecimals': asset_info.get('szDecimals', 6),
-                        'szStep': asset_info.get('szStep', '0.000001'),
-                        'maxLeverage': asset_info.get('maxLeverage', 50),
+                        'szDecimals': asset_info.get('szDecimals', _DEFAULT_SZ_DECIMALS),
+                        'szStep': asset_info.get('szStep', _DEFAULT_SZ_STEP),
+                        'maxLeverage': asset_info.get('maxLeverage', _DEFAULT_MAX_LEVERAGE),
                         'onlyIsolated': asset_info.get('onlyIsolated', False)
                     }
 
-            # Обновляем кэш
-            self._cache = asset_meta
-            self._cache_timestamp = current_time
+            # Обновляем кэш; старые мемоизированные записи отсекаются новым
+            # поколением. Свежий срез уходит и на диск — переживет рестарт
+            self._install_meta(asset_meta)
+            self._store_disk_cache(asset_meta)
 
-            self.logger.info(f"Asset metadata updated: {len(asset_meta)} assets")
+            self.logger.info("Asset metadata updated: %d assets", len(asset_meta))
             return asset_meta
 
         except Exception as e:
-            self.logger.error(f"Failed to fetch asset metadata: {e}")
+            self.logger.error("Failed to fetch asset metadata: %s", e)
             return self._cache if self._cache else {}
 
+    def _get_cached(self) -> Dict[str, dict]:
+        """Быстрый путь доступа к кэшу: только сравнение с монотонным дедлайном,
+        без логирования и обработки исключений; refresh уходит в get_asset_meta"""
+        if self._cache and time.monotonic() < self._cache_expires_at:
+            return self._cache
+        return self.get_asset_meta()
+
     def get_asset_info(self, symbol: str) -> Dict[str, Any]:
         """Получение информации о конкретном активе"""
-        meta = self.get_asset_meta()
-        return meta.get(symbol, {})
+        return self._get_cached().get(symbol, {})
 
     def get_size_decimals(self, symbol: str) -> int:
         """Получение количества десятичных знаков для размера позиции"""
-        asset_info = self.get_asset_info(symbol)
-        return asset_info.get('szDecimals', 6)
+        self._get_cached()  # Освежаем кэш при необходимости
+        return _resolved_asset_info(self, symbol, self._generation)[0]
 
-    def get_size_step(self, symbol: str) -> str:
+    def get_size_step(self, symbol: str) -> float:
         """Получение минимального шага размера позиции"""
-        asset_info = self.get_asset_info(symbol)
-        return asset_info.get('szStep', '0.000001')
+        self._get_cached()
+        return _resolved_asset_info(self, symbol, self._generation)[1]
 
     def get_max_leverage(self, symbol: str) -> int:
         """Получение максимального плеча для актива"""
-        asset_info = self.get_asset_info(symbol)
-        return asset_info.get('maxLeverage', 50)
+        self._get_cached()
+        return _resolved_asset_info(self, symbol, self._generation)[2]
 
+    def snapshot(self) -> Dict[str, AssetRow]:
+        """Срез параметров всех активов одним обращением — для циклов по символам"""
+        self._get_cached()
+        return self._snapshot
 
-# Глобальный экземпляр для использования в других модулях
-_asset_metadata_provider = None
 
+@lru_cache(maxsize=2048)
+def _resolved_asset_info(provider: AssetMetadataProvider, symbol: str, generation: int) -> Tuple[int, float, int]:
+    """Мемоизация параметров актива по поколению кэша провайдера"""
+    i = provider._idx.get(symbol)
+    if i is None:
+        return (_DEFAULT_SZ_DECIMALS, _DEFAULT_SZ_STEP, _DEFAULT_MAX_LEVERAGE)
+    return (
+        int(provider._sz_dec[i]),
+        float(provider._sz_step[i]),
+        int(provider._max_lev[i])
+    )
 
+
+# Глобальный экземпляр для использования в других модулях
+@cache
 def get_asset_metadata_provider() -> AssetMetadataProvider:
-    """Получение глобального экземпляра провайдера метаданных"""
-    global _asset_metadata_provider
-    if _asset_metadata_provider is None:
-        _asset_metadata_provider = AssetMetadataProvider()
-    return _asset_metadata_provider
+    """Получение глобального экземпляра провайдера метаданных (ленивый синглтон)"""
+    return AssetMetadataProvider()
@@ -1,5 +1,6 @@
-import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
+from functools import cached_property
+import json_utils
 from logger_config import setup_unified_logger
 from config_validator import ConfigValidator, ConfigValidationError
 
@@ -16,35 +17,36 @@ class ConfigManager:
     def _load_config(self) -> Dict[str, Any]:
         """Загрузка конфигурации из файла"""
         try:
-            with open(self.config_path) as f:
-                config = json.load(f)
-            self.logger.info(f"Configuration loaded from {self.config_path}")
+            config = json_utils.load_file(self.config_path)
+            self.logger.info("Configuration loaded from %s", self.config_path)
 
             # Валидируем конфигурацию
             self.validator.validate_and_raise(config)
 
+            # Предвычисляем неизменяемый список символов один раз на загрузку
+            self._all_symbols = ('BTC', *config.get('shorts', []))
+
             return config
         except ConfigValidationError:
             raise
         except FileNotFoundError:
-            self.logger.error(f"Configuration file not found: {self.config_path}")
+            self.logger.error("Configuration file not found: %s", self.config_path)
             raise
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Invalid JSON in configuration file: {e}")
+        except json_utils.JSONDecodeError as e:
+            self.logger.error("Invalid JSON in configuration file: %s", e)
             raise
         except Exception as e:
-            self.logger.error(f"Failed to load configuration from {self.config_path}: {e}")
+            self.logger.error("Failed to load configuration from %s: %s", self.config_path, e)
             raise
 
     def save_config(self) -> bool:
         """Сохранение конфигурации в файл"""
         try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            self.logger.info(f"Configuration saved to {self.config_path}")
+            json_utils.dump_file(self.config, self.config_path)
+            self.logger.info("Configuration saved to %s", self.config_path)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to save configuration: {e}")
+            self.logger.error("Failed to save configuration: %s", e)
             return False
 
     def get(self, key: str, default: Any = None) -> Any:
@@ -54,88 +56,97 @@ class ConfigManager:
     def set(self, key: str, value: Any) -> None:
         """Установка значения в конфигурации"""
         self.config[key] = value
+        self._invalidate_cached_properties()
+        if key == 'shorts':
+            self._all_symbols = ('BTC', *value)
 
-    @property
+    def _invalidate_cached_properties(self) -> None:
+        """Сброс закэшированных свойств после изменения конфигурации"""
+        for name, attr in type(self).__dict__.items():
+            if isinstance(attr, cached_property):
+                self.__dict__.pop(name, None)
+
+    @cached_property
     def account_address(self) -> str:
         """Адрес аккаунта"""
         return self.config['account_address']
 
-    @property
+    @cached_property
     def secret_key(self) -> str:
         """Секретный ключ"""
         return self.config['secret_key']
 
-    @property
+    @cached_property
     def commission_pct(self) -> float:
         """Процент комиссии"""
         return self.config.get('commission_pct', 0.0004)
 
-    @property
+    @cached_property
     def shorts(self) -> List[str]:
         """Список активов для коротких позиций"""
         return self.config.get('shorts', [])
 
     @property
-    def all_symbols(self) -> List[str]:
+    def all_symbols(self) -> Tuple[str, ...]:
         """Все торгуемые символы (BTC + shorts)"""
-        return ['BTC'] + self.shorts
+        return self._all_symbols
 
-    @property
+    @cached_property
     def start_nav(self) -> float:
         """Начальный NAV для справки"""
         return self.config.get('start_nav', 100.0)
 
-    @property
+    @cached_property
     def gross(self) -> float:
         """Общий мультипликатор позиций"""
         return self.config.get('gross', 3.0)
 
-    @property
+    @cached_property
     def rebalance_threshold(self) -> float:
         """Порог ребалансировки (процентное отклонение от target)"""
         return self.config.get('rebalance_threshold', 0.02)
 
-    @property
+    @cached_property
     def ratio_low(self) -> float:
         """Нижняя граница ratio для ребалансировки"""
         return self.config.get('ratio_low', 1.8)
 
-    @property
+    @cached_property
     def ratio_high(self) -> float:
         """Верхняя граница ratio для ребалансировки"""
         return self.config.get('ratio_high', 2.2)
 
-    @property
+    @cached_property
     def max_leverage(self) -> int:
         """Максимальное плечо"""
         return self.config.get('max_leverage', 5)
 
-    @property
+    @cached_property
     def leverage_btc(self) -> int:
         """Плечо для BTC"""
         return self.config.get('leverage_btc', 3)
 
-    @property
+    @cached_property
     def leverage_shorts(self) -> int:
         """Плечо для шортов"""
         return self.config.get('leverage_shorts', 3)
 
-    @property
+    @cached_property
     def reserve_usd_percent(self) -> float:
         """Процент резерва в USD"""
         return self.config.get('reserve_usd_percent', 0.05)
 
-    @property
+    @cached_property
     def ratio_target(self) -> float:
         """Целевое соотношение BTC к шортам"""
         return self.config.get('ratio_tgt', 2.0)
 
-    @property
+    @cached_property
     def rebalance_enabled(self) -> bool:
         """Включена ли ребалансировка"""
         return self.config.get('rebalance_enabled', True)
 
-    @property
+    @cached_property
     def telegram_chat_id(self) -> str:
         """ID чата для Telegram уведомлений"""
         return self.config.get('telegram_chat_id', '')
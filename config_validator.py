@@ -3,15 +3,57 @@
 Проверяет обязательные поля и корректность значений в config.json
 """
 
+import re
 from typing import Dict, Any, List, Tuple
 from logger_config import setup_unified_logger
 
+# Скомпилированные проверки hex-полей: отбрасываем некорректные адреса/ключи
+# до того, как они уронят сетевые вызовы
+_HEX_ADDR = re.compile(r"0x[0-9a-fA-F]{40}")
+_HEX_KEY = re.compile(r"0x[0-9a-fA-F]{64}")
+
 
 class ConfigValidationError(Exception):
     """Исключение для ошибок валидации конфигурации"""
     pass
 
 
+# "Схема" конфигурации, собранная один раз на импорт модуля —
+# validate_config не пересоздает таблицы ограничений на каждый вызов
+REQUIRED_FIELDS = (
+    'account_address',
+    'secret_key',
+    'start_nav',
+    'gross',
+    'ratio_tgt',
+    'ratio_low',
+    'ratio_high',
+    'leverage_btc',
+    'leverage_shorts',
+    'shorts'
+)
+
+NUMERIC_FIELDS = {
+    'start_nav': (float, 1.0, 1000000.0),
+    'gross': (float, 1.0, 10.0),
+    'ratio_tgt': (float, 0.1, 10.0),
+    'ratio_low': (float, 0.1, 10.0),
+    'ratio_high': (float, 0.1, 10.0),
+    'leverage_btc': (int, 1, 50),
+    'leverage_shorts': (int, 1, 50)
+}
+
+BOOLEAN_FIELDS = ('rebalance_enabled',)
+
+OPTIONAL_NUMERIC_FIELDS = {
+    'reserve_usd_percent': (float, 0.0, 0.5),
+    'stop_loss_pct': (float, 0.01, 0.5),
+    'min_shorts': (int, 1, 10)
+}
+
+API_DELAY_FIELDS = ('order_processing', 'leverage_update', 'position_check')
+
+
 class ConfigValidator:
     """Валидатор конфигурации"""
 
@@ -28,44 +70,21 @@ class ConfigValidator:
         errors = []
 
         # Проверяем обязательные поля
-        required_fields = [
-            'account_address',
-            'secret_key',
-            'start_nav',
-            'gross',
-            'ratio_tgt',
-            'ratio_low',
-            'ratio_high',
-            'leverage_btc',
-            'leverage_shorts',
-            'shorts'
-        ]
-
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if field not in config:
                 errors.append(f"Missing required field: {field}")
 
         # Проверяем типы и значения
         if 'account_address' in config:
-            if not isinstance(config['account_address'], str) or not config['account_address'].startswith('0x'):
+            if not isinstance(config['account_address'], str) or not _HEX_ADDR.fullmatch(config['account_address']):
                 errors.append("account_address must be a valid Ethereum address starting with 0x")
 
         if 'secret_key' in config:
-            if not isinstance(config['secret_key'], str) or not config['secret_key'].startswith('0x'):
+            if not isinstance(config['secret_key'], str) or not _HEX_KEY.fullmatch(config['secret_key']):
                 errors.append("secret_key must be a valid private key starting with 0x")
 
         # Проверяем числовые значения
-        numeric_fields = {
-            'start_nav': (float, 1.0, 1000000.0),
-            'gross': (float, 1.0, 10.0),
-            'ratio_tgt': (float, 0.1, 10.0),
-            'ratio_low': (float, 0.1, 10.0),
-            'ratio_high': (float, 0.1, 10.0),
-            'leverage_btc': (int, 1, 50),
-            'leverage_shorts': (int, 1, 50)
-        }
-
-        for field, (expected_type, min_val, max_val) in numeric_fields.items():
+        for field, (expected_type, min_val, max_val) in NUMERIC_FIELDS.items():
             if field in config:
                 try:
                     value = expected_type(config[field])
@@ -75,8 +94,7 @@ class ConfigValidator:
                     errors.append(f"{field} must be a valid {expected_type.__name__}")
 
         # Проверяем логические значения
-        boolean_fields = ['rebalance_enabled']
-        for field in boolean_fields:
+        for field in BOOLEAN_FIELDS:
             if field in config and not isinstance(config[field], bool):
                 errors.append(f"{field} must be a boolean value")
 
@@ -89,19 +107,13 @@ class ConfigValidator:
                     if not isinstance(symbol, str) or len(symbol) == 0:
                         errors.append(f"Invalid symbol in shorts: {symbol}")
 
-        # Проверяем соотношения
-        if all(field in config for field in ['ratio_low', 'ratio_tgt', 'ratio_high']):
-            if not (config['ratio_low'] <= config['ratio_tgt'] <= config['ratio_high']):
-                errors.append("ratio_low <= ratio_tgt <= ratio_high constraint violated")
+        # Проверяем соотношения (один набор lookups вместо membership-прохода + трех subscripts)
+        ratio_low, ratio_tgt, ratio_high = config.get('ratio_low'), config.get('ratio_tgt'), config.get('ratio_high')
+        if None not in (ratio_low, ratio_tgt, ratio_high) and not (ratio_low <= ratio_tgt <= ratio_high):
+            errors.append("ratio_low <= ratio_tgt <= ratio_high constraint violated")
 
         # Проверяем опциональные поля
-        optional_fields = {
-            'reserve_usd_percent': (float, 0.0, 0.5),
-            'stop_loss_pct': (float, 0.01, 0.5),
-            'min_shorts': (int, 1, 10)
-        }
-
-        for field, (expected_type, min_val, max_val) in optional_fields.items():
+        for field, (expected_type, min_val, max_val) in OPTIONAL_NUMERIC_FIELDS.items():
             if field in config:
                 try:
                     value = expected_type(config[field])
@@ -115,8 +127,7 @@ class ConfigValidator:
             if not isinstance(config['api_delays'], dict):
                 errors.append("api_delays must be an object")
             else:
-                delay_fields = ['order_processing', 'leverage_update', 'position_check']
-                for delay_field in delay_fields:
+                for delay_field in API_DELAY_FIELDS:
                     if delay_field in config['api_delays']:
                         try:
                             delay_value = int(config['api_delays'][delay_field])
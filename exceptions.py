@@ -54,6 +54,11 @@ class ValidationError(HyperliquidTradingError):
     pass
 
 
+class CircuitOpenError(HyperliquidTradingError):
+    """Circuit breaker разомкнут — вызов отклонен без похода в сеть"""
+    pass
+
+
 class NetworkError(APIError):
     """Ошибки сети/подключения"""
     pass
@@ -4,11 +4,13 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Mapping, Optional, Tuple
 from dataclasses import dataclass
 
+import numpy as np
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class OrderResult:
     """Результат размещения ордера"""
     success: bool
@@ -19,7 +21,7 @@ class OrderResult:
     error_message: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PositionInfo:
     """Информация о позиции"""
     symbol: str
@@ -52,8 +54,8 @@ class IPositionProvider(ABC):
     """Интерфейс для получения информации о позициях"""
 
     @abstractmethod
-    def get_positions(self) -> Dict[str, float]:
-        """Получение текущих позиций"""
+    def get_positions(self) -> Mapping[str, float]:
+        """Получение текущих позиций (read-only view)"""
         pass
 
     @abstractmethod
@@ -66,6 +68,12 @@ class IPositionProvider(ABC):
         """Получение сводки по аккаунту"""
         pass
 
+    @abstractmethod
+    def get_positions_soa(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Получение позиций в колоночном виде (symbols, sizes, unrealized_pnl, margin_used, leverage)
+        для векторных расчетов по портфелю"""
+        pass
+
 
 class IOrderExecutor(ABC):
     """Интерфейс для исполнения ордеров"""
@@ -75,6 +83,14 @@ class IOrderExecutor(ABC):
         """Размещение рыночного ордера"""
         pass
 
+    @abstractmethod
+    def place_market_orders_batch(self, orders: List[Tuple[str, bool, float, float]]) -> Dict[str, OrderResult]:
+        """Батчевое размещение рыночных ордеров.
+
+        orders — список кортежей (symbol, is_buy, size, price);
+        возвращает результат по каждому символу"""
+        pass
+
     @abstractmethod
     def close_position(self, symbol: str) -> OrderResult:
         """Закрытие позиции"""
@@ -0,0 +1,78 @@
+"""
+Утилиты для быстрой (де)сериализации JSON
+Используют orjson при наличии, с прозрачным откатом на стандартный json
+"""
+
+import json
+import mmap
+import os
+from typing import Any
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
+
+# Единый тип ошибки парсинга для вызывающих модулей
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data) -> Any:
+    """Разбор JSON из строки или байтов"""
+    if _HAS_ORJSON:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            # Приводим к стандартному типу ошибки
+            raise json.JSONDecodeError(str(e), data if isinstance(data, str) else '', 0) from e
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Сериализация в компактные байты (одна JSONL-строка)"""
+    if _HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def load_file(path: str) -> Any:
+    """Чтение и разбор JSON-файла через mmap (один буфер, без копии read())"""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Пустой файл или mmap недоступен — обычное чтение
+            return loads(f.read())
+        try:
+            if _HAS_ORJSON:
+                return loads(memoryview(mm))
+            # stdlib json не принимает mmap напрямую
+            return loads(mm[:])
+        finally:
+            mm.close()
+
+
+def dump_file(obj: Any, path: str, indent: bool = True, atomic: bool = False) -> None:
+    """Сериализация объекта в JSON-файл.
+
+    При atomic=True пишем во временный файл и подменяем целевой одним
+    os.replace: упавший посреди записи процесс не оставит обрезанный JSON
+    """
+    if _HAS_ORJSON:
+        payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    else:
+        payload = json.dumps(obj, indent=2 if indent else None).encode()
+
+    if not atomic:
+        with open(path, 'wb') as f:
+            f.write(payload)
+        return
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -1,6 +1,13 @@
+import atexit
 import logging
+import logging.handlers
 import datetime
 import os
+import queue
+import re
+import threading
+import time
+from functools import lru_cache
 from typing import Optional
 
 
@@ -32,6 +39,13 @@ class ColoredFormatter(logging.Formatter):
 
     RESET = '\033[0m'  # Сброс цвета
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Предвычисляем таблицу подстановок: один проход регулярным выражением
+        # вместо перебора всех ключевых слов на каждую запись
+        self._kw_re = re.compile("|".join(re.escape(k) for k in self.SPECIAL_COLORS))
+        self._kw_map = {k: f"{v}{k}{self.RESET}" for k, v in self.SPECIAL_COLORS.items()}
+
     def format(self, record):
         # Получаем базовое сообщение
         message = super().format(record)
@@ -39,11 +53,8 @@ class ColoredFormatter(logging.Formatter):
         # Применяем цвет уровня логирования
         level_color = self.COLORS.get(record.levelname, '')
 
-        # Ищем специальные ключевые слова для дополнительной раскраски
-        for keyword, color in self.SPECIAL_COLORS.items():
-            if keyword in message:
-                message = message.replace(keyword, f"{color}{keyword}{self.RESET}")
-                break
+        # Раскрашиваем специальные ключевые слова одним проходом
+        message = self._kw_re.sub(lambda m: self._kw_map[m.group(0)], message)
 
         # Применяем основной цвет
         if level_color:
@@ -74,21 +85,41 @@ class TradingFilter(logging.Filter):
         'update', 'change', 'ratio', 'target', 'actual'
     ]
 
+    # Один скомпилированный проход вместо K substring-поисков;
+    # re.IGNORECASE избавляет от .lower()-аллокации на каждую запись
+    _kw_re = re.compile("|".join(re.escape(k) for k in IMPORTANT_KEYWORDS), re.IGNORECASE)
+
     def filter(self, record):
         """Фильтрует записи - пропускает только важные"""
         # Всегда пропускаем WARNING и выше
         if record.levelno >= logging.WARNING:
             return True
 
-        # Проверяем наличие важных ключевых слов (без учета регистра)
-        message_lower = record.getMessage().lower()
-        return any(keyword in message_lower for keyword in self.IMPORTANT_KEYWORDS)
+        # Проверяем наличие важных ключевых слов (без учета регистра).
+        # При ленивом %-логировании ищем по шаблону без форматирования —
+        # запись, которая будет отброшена, не материализует сообщение
+        if record.args:
+            message = record.getMessage()
+        else:
+            message = str(record.msg)
+        return self._kw_re.search(message) is not None
 
 
 # Глобальная переменная для хранения единого файла сессии
 _session_log_file: Optional[str] = None
 _session_timestamp: Optional[str] = None
 
+# Единые обработчики, разделяемые всеми логгерами:
+# один файловый дескриптор и один буфер вместо дескриптора на модуль
+_session_file_handler: Optional[logging.Handler] = None
+_session_console_handler: Optional[logging.Handler] = None
+_handler_lock = threading.Lock()
+
+# Вынос I/O логирования в фоновый поток: горячие пути только кладут
+# LogRecord в очередь, запись в файл/консоль выполняет QueueListener
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
 
 def get_session_log_file() -> str:
     """Получает имя файла для текущей сессии торговли"""
@@ -108,10 +139,14 @@ def get_session_log_file() -> str:
     return _session_log_file
 
 
+@lru_cache(maxsize=32)
 def setup_unified_logger(name: str, console_level: int = logging.INFO, file_level: int = logging.INFO):
     """
     Настройка единого логгера для всех модулей торгового бота
 
+    Мемоизировано по имени: повторное создание компонента с тем же логгером
+    не перевешивает обработчики и не пишет второй "[INIT]" в лог.
+
     Args:
         name: Имя логгера (модуля)
         console_level: Уровень логирования для консоли
@@ -128,26 +163,39 @@ def setup_unified_logger(name: str, console_level: int = logging.INFO, file_leve
     # Очищаем старые обработчики
     logger.handlers = []
 
-    # Получаем единый файл сессии
-    session_log_file = get_session_log_file()
-
-    # Обработчик для файла (с фильтрацией важных событий)
-    file_handler = logging.FileHandler(session_log_file, encoding='utf-8')
-    file_handler.setLevel(file_level)
-    file_handler.addFilter(TradingFilter())  # Добавляем фильтр
-    file_formatter = logging.Formatter('%(asctime)s [%(name)s] %(levelname)s: %(message)s')
-    file_handler.setFormatter(file_formatter)
-
-    # Обработчик для консоли (с цветами, все важные сообщения)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(console_level)
-    console_handler.addFilter(TradingFilter())  # Добавляем тот же фильтр
-    console_formatter = ColoredFormatter('%(asctime)s [%(name)s] %(levelname)s: %(message)s')
-    console_handler.setFormatter(console_formatter)
-
-    # Добавляем обработчики
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    global _session_file_handler, _session_console_handler, _queue_listener
+
+    with _handler_lock:
+        if _session_file_handler is None:
+            # Получаем единый файл сессии
+            session_log_file = get_session_log_file()
+
+            # Обработчик для файла (с фильтрацией важных событий)
+            _session_file_handler = logging.FileHandler(session_log_file, encoding='utf-8')
+            _session_file_handler.setLevel(file_level)
+            _session_file_handler.addFilter(TradingFilter())  # Добавляем фильтр
+            file_formatter = logging.Formatter('%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+            _session_file_handler.setFormatter(file_formatter)
+
+            # Обработчик для консоли (с цветами, все важные сообщения)
+            _session_console_handler = logging.StreamHandler()
+            _session_console_handler.setLevel(console_level)
+            _session_console_handler.addFilter(TradingFilter())  # Добавляем тот же фильтр
+            console_formatter = ColoredFormatter('%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+            _session_console_handler.setFormatter(console_formatter)
+
+            # Запускаем фоновую доставку записей к обработчикам
+            _queue_listener = logging.handlers.QueueListener(
+                _log_queue,
+                _session_file_handler,
+                _session_console_handler,
+                respect_handler_level=True
+            )
+            _queue_listener.start()
+            atexit.register(_queue_listener.stop)
+
+    # Горячий путь логирования — только постановка записи в очередь
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
 
     # Логируем инициализацию модуля
     logger.info(f"[INIT] Module {name} initialized")
@@ -155,8 +203,19 @@ def setup_unified_logger(name: str, console_level: int = logging.INFO, file_leve
     return logger
 
 
+_last_session_end = 0.0
+
+
 def log_session_end():
     """Записывает окончание сессии в лог"""
+    global _last_session_end
+    # Защита от повторных вызовов из нескольких finally/except-путей:
+    # в пределах секунды пишем запись только один раз
+    now = time.monotonic()
+    if now - _last_session_end < 1.0:
+        return
+    _last_session_end = now
+
     if _session_log_file:
         with open(_session_log_file, 'a', encoding='utf-8') as f:
             f.write("\n" + "=" * 80 + "\n")
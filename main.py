@@ -4,6 +4,7 @@
 """
 
 import sys
+import io
 import argparse
 import signal
 import time
@@ -16,36 +17,61 @@ if TYPE_CHECKING:
     from trader import HyperliquidTrader
 
 
-def log_session_end() -> None:
-    """Логирование завершения сессии"""
-    current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-    print(f"\n📝 Session ended at {current_time}")
+# Меню собираются один раз на импорт: один write вместо 8-9 вызовов print
+_MAIN_MENU = (
+    "\n" + "=" * 50 + "\n"
+    "🤖 HYPERLIQUID TRADING BOT\n"
+    + "=" * 50 + "\n"
+    "1. 🚀 Запустить трейдера (основной цикл)\n"
+    "2. ⚙️  Управление плечом (leverage)\n"
+    "3. 🛑 Закрыть все позиции\n"
+    "4. ⚖️  Принудительная ребалансировка\n"
+    "5. 📊 Показать статус портфеля\n"
+    "0. 👋 Выход\n"
+    + "=" * 50 + "\n"
+)
+
+# Максимальный возраст снимка портфеля из основного цикла, после которого
+# меню запрашивает статус заново
+_SNAPSHOT_MAX_AGE = 30.0
+
+# Поля позиции, читаемые при печати статуса — один кортеж на модуль
+# вместо трех отдельных details.get(...) на каждую позицию
+_POS_FIELDS = ('size', 'unrealized_pnl', 'margin_used')
+
+
+def _position_row(details: dict) -> tuple:
+    """Выборка полей позиции одним проходом (size, unrealized_pnl, margin_used)"""
+    get = details.get
+    return tuple(get(field, 0) for field in _POS_FIELDS)
+
+
+# Предкомпилированные шаблоны строк leverage: format_map на готовой строке —
+# один C-вызов вместо пересборки f-строки на каждый символ
+_LEV_ROW_RU = "  {icon} {sym}: {lev:.1f}x (ожидается: {exp}x)".format_map
+_LEV_ROW_EN = "{icon} {sym}: {lev:.1f}x (expected: {exp}x)".format_map
+
+
+_LEVERAGE_MENU = (
+    "\n" + "=" * 40 + "\n"
+    "⚙️  УПРАВЛЕНИЕ ПЛЕЧОМ\n"
+    + "=" * 40 + "\n"
+    "1. 🔍 Проверить текущие настройки leverage\n"
+    "2. 🔄 ПОЛНЫЙ СБРОС (закрыть все + установить leverage + восстановить)\n"
+    "0. ⬅️  Назад в главное меню\n"
+    + "=" * 40 + "\n"
+)
 
 
 def show_menu() -> None:
     """Отображение главного меню"""
-    print("\n" + "=" * 50)
-    print("🤖 HYPERLIQUID TRADING BOT")
-    print("=" * 50)
-    print("1. 🚀 Запустить трейдера (основной цикл)")
-    print("2. ⚙️  Управление плечом (leverage)")
-    print("3. 🛑 Закрыть все позиции")
-    print("4. ⚖️  Принудительная ребалансировка")
-    print("5. 📊 Показать статус портфеля")
-    print("0. 👋 Выход")
-    print("=" * 50)
+    sys.stdout.write(_MAIN_MENU)
 
 
 def handle_leverage_menu(trader: 'HyperliquidTrader') -> None:
     """Обработка меню управления плечом"""
     while True:
-        print("\n" + "=" * 40)
-        print("⚙️  УПРАВЛЕНИЕ ПЛЕЧОМ")
-        print("=" * 40)
-        print("1. 🔍 Проверить текущие настройки leverage")
-        print("2. 🔄 ПОЛНЫЙ СБРОС (закрыть все + установить leverage + восстановить)")
-        print("0. ⬅️  Назад в главное меню")
-        print("=" * 40)
+        sys.stdout.write(_LEVERAGE_MENU)
 
         choice = input("\nВаш выбор (0-2): ").strip()
 
@@ -64,18 +90,21 @@ def handle_leverage_menu(trader: 'HyperliquidTrader') -> None:
                       f"Shorts={trader.config_manager.leverage_shorts}x")
 
                 if current_leverages:
+                    # Читаем конфиг один раз, а не по цепочке атрибутов на каждый символ
+                    lev_btc = trader.config_manager.leverage_btc
+                    lev_shorts = trader.config_manager.leverage_shorts
                     print(f"\n📊 Текущие leverage на бирже:")
                     for symbol, leverage in current_leverages.items():
-                        expected = (trader.config_manager.leverage_btc if symbol == 'BTC'
-                                    else trader.config_manager.leverage_shorts)
+                        expected = lev_btc if symbol == 'BTC' else lev_shorts
                         is_compliant = compliance.get(symbol, False)
                         status_icon = "✅" if is_compliant else "❌"
-                        print(f"  {status_icon} {symbol}: {leverage:.1f}x (ожидается: {expected}x)")
+                        print(_LEV_ROW_RU({'icon': status_icon, 'sym': symbol, 'lev': leverage, 'exp': expected}))
 
-                    if all(compliance.values()):
+                    # Один проход по compliance вместо all() + повторной итерации
+                    non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
+                    if not non_compliant:
                         print("\n✅ Все leverage настроены корректно!")
                     else:
-                        non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
                         print(f"\n⚠️  Проблемы с leverage: {non_compliant}")
                         print("   💡 Используйте опцию 2 для ПОЛНОГО СБРОСА")
                 else:
@@ -124,11 +153,20 @@ def handle_leverage_menu(trader: 'HyperliquidTrader') -> None:
 
 def show_portfolio_status(trader: 'HyperliquidTrader') -> None:
     """Отображение статуса портфеля"""
+    # Весь статус собирается в буфер и уходит в stdout одним write:
+    # один syscall вместо ~20 при выводе в пайп (docker/journald)
+    buf = io.StringIO()
     try:
-        print("\n📊 СТАТУС ПОРТФЕЛЯ")
-        print("=" * 50)
-
-        status = trader.get_portfolio_status()
+        print("\n📊 СТАТУС ПОРТФЕЛЯ", file=buf)
+        print("=" * 50, file=buf)
+
+        # Свежий снимок из основного цикла избавляет от лишнего round-trip
+        # к бирже при каждом заходе в меню
+        snapshot_ts, snapshot = getattr(trader, '_last_snapshot', (0.0, None))
+        if snapshot and time.monotonic() - snapshot_ts < _SNAPSHOT_MAX_AGE:
+            status = snapshot
+        else:
+            status = trader.get_portfolio_status()
 
         nav = status.get('nav', 0)
         btc_value = status.get('btc_value_usd', 0)
@@ -139,7 +177,7 @@ def show_portfolio_status(trader: 'HyperliquidTrader') -> None:
         position_details = status.get('position_details', {})
         margin_summary = status.get('margin_summary', {})
 
-        print(f"💰 NAV: ${nav:.2f}")
+        print(f"💰 NAV: ${nav:.2f}", file=buf)
 
         # Показываем резерв если он есть
         reserve_percent = getattr(trader.config_manager, 'reserve_usd_percent', 0.05)
@@ -147,75 +185,76 @@ def show_portfolio_status(trader: 'HyperliquidTrader') -> None:
         nav_for_trading = nav - reserve_amount
 
         if reserve_amount > 0:
-            print(f"🏦 Reserve ({reserve_percent:.1%}): ${reserve_amount:.2f}")
-            print(f"💹 NAV for Trading: ${nav_for_trading:.2f}")
+            print(f"🏦 Reserve ({reserve_percent:.1%}): ${reserve_amount:.2f}", file=buf)
+            print(f"💹 NAV for Trading: ${nav_for_trading:.2f}", file=buf)
 
-        print("\n📊 Position Analysis:")
-        print(f"📈 BTC Value: ${btc_value:.2f}")
-        print(f"📉 Shorts Value: ${shorts_value:.2f}")
-        print(f"⚖️  Position Ratio (by margin): {current_ratio:.2f} (Target: {target_ratio:.2f})")
+        print("\n📊 Position Analysis:", file=buf)
+        print(f"📈 BTC Value: ${btc_value:.2f}", file=buf)
+        print(f"📉 Shorts Value: ${shorts_value:.2f}", file=buf)
+        print(f"⚖️  Position Ratio (by margin): {current_ratio:.2f} (Target: {target_ratio:.2f})", file=buf)
 
         if current_ratio and target_ratio and target_ratio > 0:
             ratio_deviation_pct = abs(current_ratio - target_ratio) / target_ratio * 100
-            print(f"📈 Position Ratio Deviation: {ratio_deviation_pct:.1f}%")
+            print(f"📈 Position Ratio Deviation: {ratio_deviation_pct:.1f}%", file=buf)
 
         if margin_summary:
             btc_margin_used = margin_summary.get('btc_margin_used', 0)
             shorts_margin_used = margin_summary.get('shorts_margin_used', 0)
             total_margin_used = margin_summary.get('total_margin_used', 0)
 
-            print("\n💳 Margin Analysis:")
+            print("\n💳 Margin Analysis:", file=buf)
             if total_margin_used > 0:
-                print(f"📊 Total Margin Used: ${total_margin_used:.2f}")
+                print(f"📊 Total Margin Used: ${total_margin_used:.2f}", file=buf)
             if btc_margin_used > 0:
-                print(f"📈 BTC Margin: ${btc_margin_used:.2f}")
+                print(f"📈 BTC Margin: ${btc_margin_used:.2f}", file=buf)
             if shorts_margin_used > 0:
-                print(f"📉 Shorts Margin: ${shorts_margin_used:.2f}")
+                print(f"📉 Shorts Margin: ${shorts_margin_used:.2f}", file=buf)
 
-        print("\n⚙️ Leverage Settings:")
-        print(f"📈 BTC Config Leverage: {trader.config_manager.leverage_btc}x")
-        print(f"📉 Shorts Config Leverage: {trader.config_manager.leverage_shorts}x")
+        print("\n⚙️ Leverage Settings:", file=buf)
+        print(f"📈 BTC Config Leverage: {trader.config_manager.leverage_btc}x", file=buf)
+        print(f"📉 Shorts Config Leverage: {trader.config_manager.leverage_shorts}x", file=buf)
 
         try:
             current_leverages = status.get('current_leverages', {})
             compliance = status.get('leverage_compliance', {})
 
             if current_leverages:
-                print("\n🔍 Current Leverages on Exchange:")
+                lev_btc = trader.config_manager.leverage_btc
+                lev_shorts = trader.config_manager.leverage_shorts
+                print("\n🔍 Current Leverages on Exchange:", file=buf)
                 for symbol, leverage in current_leverages.items():
-                    expected = (trader.config_manager.leverage_btc if symbol == 'BTC'
-                                else trader.config_manager.leverage_shorts)
+                    expected = lev_btc if symbol == 'BTC' else lev_shorts
                     is_compliant = compliance.get(symbol, False)
                     status_icon = "✅" if is_compliant else "❌"
-                    print(f"{status_icon} {symbol}: {leverage:.1f}x (expected: {expected}x)")
+                    print(_LEV_ROW_EN({'icon': status_icon, 'sym': symbol, 'lev': leverage, 'exp': expected}), file=buf)
 
-                if all(compliance.values()):
-                    print("\n✅ All leverages are compliant with config")
+                non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
+                if not non_compliant:
+                    print("\n✅ All leverages are compliant with config", file=buf)
                 else:
-                    non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
-                    print(f"\n⚠️  Leverage compliance issues: {non_compliant}")
-                    print("   🔄 Use option 2 to perform FULL RESET")
+                    print(f"\n⚠️  Leverage compliance issues: {non_compliant}", file=buf)
+                    print("   🔄 Use option 2 to perform FULL RESET", file=buf)
 
         except Exception as e:
-            print(f"\n❌ Error checking leverage compliance: {e}")
+            print(f"\n❌ Error checking leverage compliance: {e}", file=buf)
 
         if open_positions:
-            print("\n📍 Open Positions:")
+            print("\n📍 Open Positions:", file=buf)
             for symbol in open_positions.keys():
-                details = position_details.get(symbol, {})
-                size = details.get('size', 0)
-                unrealized_pnl = details.get('unrealized_pnl', 0)
-                margin_used = details.get('margin_used', 0)
+                size, unrealized_pnl, margin_used = _position_row(position_details.get(symbol, {}))
 
                 side = "LONG" if size > 0 else "SHORT"
                 pnl_sign = "+" if unrealized_pnl >= 0 else ""
 
-                print(f"  {symbol} {side}: {pnl_sign}${unrealized_pnl:.2f} PnL (Margin: ${margin_used:.2f})")
+                print(f"  {symbol} {side}: {pnl_sign}${unrealized_pnl:.2f} PnL (Margin: ${margin_used:.2f})", file=buf)
         else:
-            print("\n✅ No open positions")
+            print("\n✅ No open positions", file=buf)
 
     except Exception as e:
-        print(f"❌ Ошибка при получении статуса портфеля: {e}")
+        print(f"❌ Ошибка при получении статуса портфеля: {e}", file=buf)
+    finally:
+        # Сбрасываем буфер и при исключении — частичный статус лучше пустого
+        sys.stdout.write(buf.getvalue())
 
 
 def main() -> None:
@@ -4,61 +4,70 @@
 """
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 from hyperliquid.info import Info
 from hyperliquid.utils.constants import MAINNET_API_URL
 from logger_config import setup_unified_logger
 from interfaces import IMarketDataProvider
+from network_utils import mount_shared_session
 # from exceptions import MarketDataError, NetworkError  # TODO: Use when implementing error handling
 
 
 class HyperliquidMarketDataProvider(IMarketDataProvider):
     """Провайдер рыночных данных для Hyperliquid"""
 
+    # Общий пул потоков для параллельных запросов funding: создается один раз,
+    # амортизирует стоимость запуска потоков между вызовами
+    _funding_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="funding")
+
     def __init__(self):
         self.logger = setup_unified_logger("market_data")
         self.info = Info(MAINNET_API_URL, skip_ws=True)
+        mount_shared_session(self.info)  # Переиспользуем keep-alive соединения между вызовами
         self._prices_cache = {}
         self._funding_cache = {}
-        self._cache_timestamp = 0
+        self._prices_expiry = 0.0
+        self._funding_expiry = 0.0
         self._cache_ttl = 10  # Кэш на 10 секунд
 
         self.logger.info("[INIT] Market data provider initialized")
 
-    def _is_cache_valid(self) -> bool:
-        """Проверка валидности кэша"""
-        return time.time() - self._cache_timestamp < self._cache_ttl
+    def _is_prices_cache_valid(self) -> bool:
+        """Проверка валидности кэша цен (монотонные часы, одно сравнение)"""
+        return time.monotonic() < self._prices_expiry
+
+    def _is_funding_cache_valid(self) -> bool:
+        """Проверка валидности кэша фандинга"""
+        return time.monotonic() < self._funding_expiry
+
+    def _extract_price(self, symbol: str) -> float:
+        """Извлечение цены символа из закэшированной карты mids"""
+        price_raw = self._prices_cache.get(symbol, 'NOT FOUND')
+        if price_raw in ('NOT FOUND', None, '', 0, 0.0):
+            self.logger.warning(f"[ERROR] Price for {symbol} not found or zero")
+            return 0.0
+        return float(price_raw)
 
     def get_prices(self, symbols: List[str]) -> Dict[str, float]:
         """Получение цен для списка символов с кэшированием"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
 
         try:
-            # Проверяем кэш
-            if self._is_cache_valid() and self._prices_cache:
-                cache_hit = all(symbol in self._prices_cache for symbol in symbols)
-                if cache_hit:
-                    self.logger.debug(f"[CACHE] Prices cache hit for {symbols}")
-                    return {symbol: self._prices_cache[symbol] for symbol in symbols}
-
-            # Получаем данные от API
-            markets = self.info.all_mids()
-            prices = {}
+            # Кэшируем полную карту mids: любой набор символов обслуживается
+            # из нее без повторного запроса, пока действует TTL
+            if self._is_prices_cache_valid() and self._prices_cache:
+                self.logger.debug("[CACHE] Prices cache hit for %s", symbols)
+                return {symbol: self._extract_price(symbol) for symbol in symbols}
 
-            for symbol in symbols:
-                price_raw = markets.get(symbol, 'NOT FOUND')
-                if price_raw in ('NOT FOUND', None, '', 0, 0.0):
-                    self.logger.warning(f"[ERROR] Price for {symbol} not found or zero")
-                    prices[symbol] = 0.0
-                else:
-                    prices[symbol] = float(price_raw)
+            # Получаем данные от API — один запрос на все рынки за TTL-окно
+            self._prices_cache = self.info.all_mids() or {}
+            self._prices_expiry = time.monotonic() + self._cache_ttl
 
-            # Обновляем кэш
-            self._prices_cache.update(prices)
-            self._cache_timestamp = time.time()
+            prices = {symbol: self._extract_price(symbol) for symbol in symbols}
 
-            duration = time.time() - operation_start
-            self.logger.debug(f"[PERF] Get prices completed in {duration:.3f}s for {len(symbols)} symbols")
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get prices completed in %.3fs for %d symbols", duration, len(symbols))
 
             return prices
 
@@ -68,37 +77,30 @@ class HyperliquidMarketDataProvider(IMarketDataProvider):
 
     def get_funding_rates(self, symbols: List[str]) -> Dict[str, float]:
         """Получение ставок фандинга с кэшированием"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
 
         try:
             # Проверяем кэш
-            if self._is_cache_valid() and self._funding_cache:
+            if self._is_funding_cache_valid() and self._funding_cache:
                 cache_hit = all(symbol in self._funding_cache for symbol in symbols)
                 if cache_hit:
-                    self.logger.debug(f"[CACHE] Funding cache hit for {symbols}")
+                    self.logger.debug("[CACHE] Funding cache hit for %s", symbols)
                     return {symbol: self._funding_cache[symbol] for symbol in symbols}
 
-            funding = {}
-
-            for symbol in symbols:
-                try:
-                    f_hist = self.info.funding_history(symbol, 0)
-                    if f_hist and len(f_hist) > 0:
-                        funding[symbol] = float(f_hist[-1].get('fundingRate', 0.0))
-                        self.logger.debug(f"[FUNDING] {symbol}: {funding[symbol]:.6f}")
-                    else:
-                        funding[symbol] = 0.0
-                        self.logger.warning(f"[FUNDING] No funding data for {symbol}")
-
-                except Exception as e:
-                    self.logger.error(f"[ERROR] Failed to get funding for {symbol}: {e}")
-                    funding[symbol] = 0.0
+            # Запрашиваем funding по всем символам параллельно:
+            # N сетевых round-trip схлопываются примерно в один
+            futures = {
+                symbol: self._funding_executor.submit(self._fetch_funding_rate, symbol)
+                for symbol in symbols
+            }
+            funding = {symbol: future.result() for symbol, future in futures.items()}
 
             # Обновляем кэш
             self._funding_cache.update(funding)
+            self._funding_expiry = time.monotonic() + self._cache_ttl
 
-            duration = time.time() - operation_start
-            self.logger.debug(f"[PERF] Get funding rates completed in {duration:.3f}s for {len(symbols)} symbols")
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get funding rates completed in %.3fs for %d symbols", duration, len(symbols))
 
             return funding
 
@@ -106,16 +108,32 @@ class HyperliquidMarketDataProvider(IMarketDataProvider):
             self.logger.error(f"[ERROR] Failed to get funding rates: {e}")
             return {symbol: 0.0 for symbol in symbols}
 
+    def _fetch_funding_rate(self, symbol: str) -> float:
+        """Получение последней ставки фандинга для одного символа (исполняется в пуле)"""
+        try:
+            f_hist = self.info.funding_history(symbol, 0)
+            if f_hist and len(f_hist) > 0:
+                rate = float(f_hist[-1].get('fundingRate', 0.0))
+                self.logger.debug("[FUNDING] %s: %.6f", symbol, rate)
+                return rate
+
+            self.logger.warning(f"[FUNDING] No funding data for {symbol}")
+            return 0.0
+
+        except Exception as e:
+            self.logger.error(f"[ERROR] Failed to get funding for {symbol}: {e}")
+            return 0.0
+
     def get_funding_history(self, symbol: str, start_time: int = 0) -> List[dict]:
         """Получение истории фандинга для символа"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
 
         try:
             funding_records = self.info.funding_history(symbol, start_time)
 
-            duration = time.time() - operation_start
-            self.logger.debug(f"[PERF] Get funding history for {symbol} completed in {duration:.3f}s")
-            self.logger.debug(f"[FUNDING] Retrieved {len(funding_records)} funding records for {symbol}")
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get funding history for %s completed in %.3fs", symbol, duration)
+            self.logger.debug("[FUNDING] Retrieved %d funding records for %s", len(funding_records), symbol)
 
             return funding_records
 
@@ -127,5 +145,6 @@ class HyperliquidMarketDataProvider(IMarketDataProvider):
         """Принудительная очистка кэша"""
         self._prices_cache.clear()
         self._funding_cache.clear()
-        self._cache_timestamp = 0
+        self._prices_expiry = 0.0
+        self._funding_expiry = 0.0
         self.logger.debug("[CACHE] Cache invalidated")
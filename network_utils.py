@@ -2,13 +2,80 @@
 Сетевые утилиты для обработки ошибок и повторных попыток
 """
 
-from typing import Callable, Any, Optional, Dict, Type
+from typing import Callable, Any, List, Optional, Dict, Type
 from functools import wraps
+from types import MethodType
 import time
 import random
 import logging
+import threading
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+import json_utils
 from logger_config import setup_unified_logger
-from exceptions import NetworkError, APIError
+from exceptions import NetworkError, APIError, CircuitOpenError
+
+
+# Таймаут по умолчанию для всех запросов общей сессии: (connect, read).
+# Без него requests ждет ответ бесконечно, и один зависший сокет
+# останавливает весь торговый цикл
+_DEFAULT_HTTP_TIMEOUT = (2.0, 5.0)
+
+
+def _fast_response_json(response, **kwargs):
+    """Декод тела ответа через json_utils (orjson при наличии).
+
+    SDK зовет response.json() на каждый user_state/meta — многокилобайтные
+    payload'ы, которые stdlib json разбирает в разы медленнее orjson
+    """
+    return json_utils.loads(response.content)
+
+
+def get_shared_http_session() -> requests.Session:
+    """Единая HTTP-сессия с пулом соединений для всех Hyperliquid-клиентов.
+
+    Переиспользование keep-alive соединений убирает TCP+TLS handshake
+    из каждого запроса торгового цикла; дефолтный таймаут ограничивает
+    худший случай зависшего соединения.
+    """
+    global _shared_http_session
+    if _shared_http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+
+        # Подставляем таймаут, если вызывающий код его не задал явно
+        original_request = session.request
+
+        def _request_with_timeout(method, url, **kwargs):
+            kwargs.setdefault('timeout', _DEFAULT_HTTP_TIMEOUT)
+            response = original_request(method, url, **kwargs)
+            # Подменяем декодер на инстансе: все клиенты общей сессии
+            # получают быстрый JSON-путь без патча SDK
+            response.json = MethodType(_fast_response_json, response)
+            return response
+
+        session.request = _request_with_timeout
+        _shared_http_session = session
+    return _shared_http_session
+
+
+def mount_shared_session(client: Any) -> None:
+    """Подключение общей сессии к SDK-клиенту (Info/Exchange), если он ее поддерживает"""
+    if hasattr(client, 'session'):
+        client.session = get_shared_http_session()
+
+
+_shared_http_session: Optional[requests.Session] = None
+
+
+# Размер кольца jitter-множителей (степень двойки для индексации битовой маской)
+_JITTER_RING_SIZE = 1024
 
 
 class NetworkRetryConfig:
@@ -20,25 +87,164 @@ class NetworkRetryConfig:
         base_delay: float = 1.0,
         max_delay: float = 60.0,
         exponential_base: float = 2.0,
-        jitter: bool = True
+        jitter: bool = True,
+        backoff_multiplier: Optional[float] = None,
+        timeout: float = 30.0
     ):
+        # backoff_multiplier — синоним exponential_base: предустановки внизу
+        # модуля исторически передают его и раньше роняли импорт TypeError'ом
+        if backoff_multiplier is not None:
+            exponential_base = backoff_multiplier
+
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.max_delay = max_delay
         self.exponential_base = exponential_base
         self.jitter = jitter
+        self.timeout = timeout
+
+        # Детерминированная часть расписания неизменна для экземпляра —
+        # считаем таблицу один раз вместо pow() на каждую неудачную попытку
+        self._delay_table = tuple(
+            min(base_delay * exponential_base ** attempt, max_delay)
+            for attempt in range(max_retries + 1)
+        )
+
+        # Кольцо готовых jitter-множителей: убирает обращение к общему
+        # состоянию random под GIL на каждую неудачную попытку. Для backoff
+        # истинная случайность не нужна — достаточно рассинхронизации вызовов.
+        self._jitter_ring = tuple(0.5 + random.random() * 0.5 for _ in range(_JITTER_RING_SIZE))
+        self._jitter_idx = 0
 
     def get_delay(self, attempt: int) -> float:
         """Рассчитать задержку для попытки"""
-        delay = self.base_delay * (self.exponential_base ** attempt)
-        delay = min(delay, self.max_delay)
+        delay = self._delay_table[attempt]
 
         if self.jitter:
-            delay *= (0.5 + random.random() * 0.5)
+            delay *= self._jitter_ring[self._jitter_idx & (_JITTER_RING_SIZE - 1)]
+            self._jitter_idx += 1
 
         return delay
 
 
+# Ошибки, при которых повтор имеет смысл: таймауты, обрывы соединения,
+# транзиентные ответы API. Ошибки валидации/авторизации сюда не входят —
+# их повтор лишь сжигает rate limit
+TRANSIENT_EXCEPTIONS = (
+    requests.Timeout,
+    requests.ConnectionError,
+    NetworkError,
+    APIError,
+)
+
+
+def retry_transient(
+    fn: Callable[[], Any],
+    attempts: int = 4,
+    base: float = 0.2,
+    cap: float = 2.0,
+    logger: Optional[logging.Logger] = None
+) -> Any:
+    """Вызов fn с ограниченным повтором транзиентных сетевых ошибок.
+
+    Backoff с полным джиттером: sleep ~ U(0, min(cap, base*2^i)),
+    чтобы конкурентные ретраи не синхронизировались в волны.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except TRANSIENT_EXCEPTIONS as exc:
+            if attempt == attempts - 1:
+                if logger:
+                    logger.error(f"Transient call failed after {attempts} attempts: {exc}")
+                raise
+
+            delay = random.uniform(0.0, min(cap, base * 2 ** attempt))
+
+            retry_after = _retry_after_seconds(exc)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+
+            if logger:
+                logger.warning(
+                    f"Transient error (attempt {attempt + 1}/{attempts}), retrying in {delay:.2f}s: {exc}")
+            time.sleep(delay)
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Извлечь Retry-After (в секундах) из ответа, прикрепленного к исключению"""
+    response = getattr(exc, 'response', None)
+    if response is None:
+        return None
+    try:
+        retry_after = response.headers.get('Retry-After')
+        return float(retry_after) if retry_after is not None else None
+    except (AttributeError, ValueError, TypeError):
+        return None
+
+
+class RetryWrapper:
+    """Вызываемая обертка повторных попыток.
+
+    Один объект со слотами вместо пары замыканий decorator/wrapper:
+    состояние (конфигурация, логгер) читается через быстрый slot-доступ,
+    без захвата ячеек замыкания на каждый вызов.
+    """
+
+    __slots__ = ('func', 'config', 'exceptions', 'logger', '__name__')
+
+    def __init__(
+        self,
+        func: Callable,
+        config: NetworkRetryConfig,
+        exceptions: tuple,
+        logger: Optional[logging.Logger]
+    ):
+        self.func = func
+        self.config = config
+        self.exceptions = exceptions
+        self.logger = logger
+        self.__name__ = getattr(func, '__name__', repr(func))
+
+    def __call__(self, *args, **kwargs):
+        func = self.func
+        config = self.config
+        logger = self.logger
+        max_retries = config.max_retries
+
+        for attempt in range(max_retries + 1):
+            try:
+                return func(*args, **kwargs)
+
+            except self.exceptions as exc:
+                if attempt == max_retries:
+                    if logger:
+                        logger.error(
+                            f"Function {self.__name__} failed after {max_retries + 1} attempts: {exc}")
+                    raise
+
+                delay = config.get_delay(attempt)
+
+                # Сервер может продиктовать собственный cooldown (HTTP 429):
+                # спать меньше Retry-After — гарантированно сжечь попытку
+                retry_after = _retry_after_seconds(exc)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+
+                if logger:
+                    logger.warning(
+                        f"Function {self.__name__} failed (attempt {attempt + 1}/{max_retries + 1}), "
+                        f"retrying in {delay:.2f}s: {exc}")
+
+                time.sleep(delay)
+
+    def __get__(self, obj, objtype=None):
+        # Поддержка декорирования методов: привязываем обертку как обычную функцию
+        if obj is None:
+            return self
+        return MethodType(self, obj)
+
+
 def with_retry(
     config: Optional[NetworkRetryConfig] = None,
     exceptions: tuple = (Exception,),
@@ -49,37 +255,28 @@ def with_retry(
         config = NetworkRetryConfig()
 
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
+        return RetryWrapper(func, config, exceptions, logger)
 
-            for attempt in range(config.max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-
-                except exceptions as exc:
-                    last_exception = exc
-
-                    if attempt == config.max_retries:
-                        if logger:
-                            logger.error(
-                                f"Function {func.__name__} failed after {config.max_retries + 1} attempts: {exc}")
-                        raise
-
-                    delay = config.get_delay(attempt)
-                    if logger:
-                        logger.warning(
-                            f"Function {func.__name__} failed (attempt {attempt + 1}/{config.max_retries + 1}), "
-                            f"retrying in {delay:.2f}s: {exc}")
+    return decorator
 
-                    time.sleep(delay)
 
-            # Это не должно выполняться, но для безопасности
-            if last_exception:
-                raise last_exception
+def _validate_core(
+    price: float,
+    previous_price: Optional[float],
+    min_price: float,
+    max_price: float,
+    max_change_percent: float
+) -> bool:
+    """Чистое числовое ядро валидации цены — без обращений к атрибутам экземпляра"""
+    if not (min_price <= price <= max_price):
+        return False
+
+    if previous_price is not None and previous_price > 0:
+        change_percent = abs(price - previous_price) / previous_price * 100
+        if change_percent > max_change_percent:
+            return False
 
-        return wrapper
-    return decorator
+    return True
 
 
 class PriceValidator:
@@ -94,30 +291,63 @@ class PriceValidator:
         self.min_price = min_price
         self.max_price = max_price
         self.max_change_percent = max_change_percent
-        self._last_prices: Dict[str, float] = {}
+        # SoA-хранилище последних цен: отображение символ→индекс плюс плотный
+        # float64-массив, чтобы батчевые операции шли целиком в NumPy
+        self._symbol_idx: Dict[str, int] = {}
+        self._last_prices = np.full(256, np.nan, dtype=np.float64)
+
+    def _index_for(self, symbol: str) -> int:
+        """Индекс символа в массиве последних цен (с геометрическим ростом)"""
+        idx = self._symbol_idx.get(symbol)
+        if idx is None:
+            idx = len(self._symbol_idx)
+            self._symbol_idx[symbol] = idx
+            if idx >= self._last_prices.shape[0]:
+                grown = np.full(self._last_prices.shape[0] * 2, np.nan, dtype=np.float64)
+                grown[:self._last_prices.shape[0]] = self._last_prices
+                self._last_prices = grown
+        return idx
 
     def validate_price(self, symbol: str, price: float, previous_price: Optional[float] = None) -> bool:
         """Проверка разумности цены"""
-        # Проверка базовых границ
-        if not (self.min_price <= price <= self.max_price):
-            return False
-
-        # Проверка изменения относительно предыдущей цены
+        idx = self._index_for(symbol)
         if previous_price is None:
-            previous_price = self._last_prices.get(symbol)
+            stored = self._last_prices[idx]
+            previous_price = None if np.isnan(stored) else stored
 
-        if previous_price is not None and previous_price > 0:
-            change_percent = abs(price - previous_price) / previous_price * 100
-            if change_percent > self.max_change_percent:
-                return False
+        if not _validate_core(price, previous_price, self.min_price, self.max_price, self.max_change_percent):
+            return False
 
         # Сохраняем цену для следующей проверки
-        self._last_prices[symbol] = price
+        self._last_prices[idx] = price
         return True
 
+    def validate_prices_batch(self, symbols: List[str], prices: np.ndarray) -> np.ndarray:
+        """Векторная валидация массива цен за один проход по NumPy-массивам"""
+        prices = np.asarray(prices, dtype=np.float64)
+        idx = np.fromiter(
+            (self._index_for(symbol) for symbol in symbols), dtype=np.intp, count=len(symbols))
+        previous = self._last_prices[idx]
+
+        valid = (prices >= self.min_price) & (prices <= self.max_price)
+
+        has_previous = ~np.isnan(previous) & (previous > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_percent = np.abs(prices - previous) / previous * 100
+        valid &= ~(has_previous & (change_percent > self.max_change_percent))
+
+        # Сохраняем валидные цены для следующей проверки одной векторной записью
+        self._last_prices[idx[valid]] = prices[valid]
+
+        return valid
+
     def get_last_price(self, symbol: str) -> Optional[float]:
         """Получить последнюю валидную цену"""
-        return self._last_prices.get(symbol)
+        idx = self._symbol_idx.get(symbol)
+        if idx is None:
+            return None
+        price = self._last_prices[idx]
+        return None if np.isnan(price) else float(price)
 
 
 class CircuitBreaker:
@@ -136,24 +366,37 @@ class CircuitBreaker:
         self.failure_count = 0
         self.last_failure_time = None
         self.state = 'CLOSED'  # CLOSED, OPEN, HALF_OPEN
+        # Блокировка берется только на переходах состояния; чтение идет
+        # через локальный снимок, чтобы не сериализовать успешные вызовы
+        self._lock = threading.Lock()
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполнить вызов через breaker.
+
+        В состоянии OPEN вызов отклоняется мгновенно (CircuitOpenError)
+        вместо ожидания таймаута — сбоящий эндпоинт не сжигает rate limit.
+        """
+        state = self.state  # Атомарный снимок состояния
+        if state == 'OPEN':
+            with self._lock:
+                if self.state == 'OPEN' and self._should_attempt_reset():
+                    self.state = 'HALF_OPEN'
+                elif self.state == 'OPEN':
+                    raise CircuitOpenError("Circuit breaker is OPEN")
+
+        try:
+            result = func(*args, **kwargs)
+            self._on_success()
+            return result
+
+        except self.expected_exception:
+            self._on_failure()
+            raise
 
     def __call__(self, func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if self.state == 'OPEN':
-                if self._should_attempt_reset():
-                    self.state = 'HALF_OPEN'
-                else:
-                    raise Exception("Circuit breaker is OPEN")
-
-            try:
-                result = func(*args, **kwargs)
-                self._on_success()
-                return result
-
-            except self.expected_exception:
-                self._on_failure()
-                raise
+            return self.call(func, *args, **kwargs)
 
         return wrapper
 
@@ -161,21 +404,48 @@ class CircuitBreaker:
         """Проверить, следует ли попытаться сбросить circuit breaker"""
         return (
             self.last_failure_time is not None and
-            time.time() - self.last_failure_time >= self.recovery_timeout
+            time.monotonic() - self.last_failure_time >= self.recovery_timeout
         )
 
     def _on_success(self):
         """Обработка успешного выполнения"""
-        self.failure_count = 0
-        self.state = 'CLOSED'
+        with self._lock:
+            self.failure_count = 0
+            self.state = 'CLOSED'
 
     def _on_failure(self):
         """Обработка сбоя"""
-        self.failure_count += 1
-        self.last_failure_time = time.time()
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time = time.monotonic()
+
+            if self.failure_count >= self.failure_threshold:
+                self.state = 'OPEN'
+
+
+# Реестр circuit breakers по эндпоинтам: компоненты, бьющие в один и тот же
+# эндпоинт, делят одно состояние breaker'а
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    name: str,
+    failure_threshold: int = 5,
+    recovery_timeout: float = 30.0
+) -> CircuitBreaker:
+    """Получить (или создать) breaker для именованного эндпоинта"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(
+                name, CircuitBreaker(failure_threshold, recovery_timeout))
+    return breaker
+
 
-        if self.failure_count >= self.failure_threshold:
-            self.state = 'OPEN'
+def get_breaker_states() -> Dict[str, str]:
+    """Снимок состояний всех breaker'ов — для метрик и диагностики"""
+    return {name: breaker.state for name, breaker in _breakers.items()}
 
 
 # Предустановленные конфигурации
@@ -4,14 +4,25 @@
 """
 
 import time
-from typing import Dict, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 from hyperliquid.exchange import Exchange
 from hyperliquid.utils.constants import MAINNET_API_URL
 from eth_account import Account
-import traceback
 from logger_config import setup_unified_logger
 from interfaces import IOrderExecutor, OrderResult
 from exceptions import OrderExecutionError, InvalidOrderSizeError, APIError
+from network_utils import mount_shared_session, retry_transient, get_circuit_breaker
+from exceptions import CircuitOpenError
+
+
+# Bulkhead для ордерных вызовов: ограничивает одновременные market_*-запросы,
+# чтобы всплеск ордеров не монополизировал пул соединений и не душил чтения
+_ORDER_SEM = threading.BoundedSemaphore(8)
+
+# Сколько ждать свободный слот, прежде чем отказать fail-fast
+_BULKHEAD_TIMEOUT = 2.0
 
 
 class HyperliquidOrderExecutor(IOrderExecutor):
@@ -22,13 +33,36 @@ class HyperliquidOrderExecutor(IOrderExecutor):
         self.wallet = Account.from_key(secret_key)
         self.account_address = account_address
         self.exchange = Exchange(self.wallet, base_url=MAINNET_API_URL, account_address=account_address)
+        mount_shared_session(self.exchange)  # Ордеры и поллинг делят теплый пул соединений
         self.asset_meta = asset_meta
 
+        # Параметры валидации константны для символа — материализуем таблицу
+        # один раз, чтобы горячий путь валидации не перепарсивал метаданные.
+        # Шаг храним в целых тиках (step_ticks при масштабе 10^szDecimals):
+        # квантование размера идет в целочисленной арифметике без FP-дрейфа
+        self._validation_table: Dict[str, Tuple[float, int, int]] = {}
+        for symbol, params in asset_meta.items():
+            sz_decimals = int(params.get('szDecimals', 6))
+            default_step = 10 ** (-sz_decimals)
+            scale = 10 ** sz_decimals
+            sz_step = float(params.get('szStep', default_step))
+            step_ticks = max(1, int(round(sz_step * scale)))
+            self._validation_table[symbol] = (
+                float(params.get('minSz', default_step)),
+                step_ticks,
+                scale
+            )
+
+        # Breakers по эндпоинтам: при серии сбоев отвечаем мгновенным отказом
+        # вместо ~30s таймаута на каждый вызов
+        self._open_breaker = get_circuit_breaker("exchange.market_open")
+        self._close_breaker = get_circuit_breaker("exchange.market_close")
+
         self.logger.info("[INIT] Order executor initialized")
 
     def place_market_order(self, symbol: str, is_buy: bool, size: float, price: float) -> OrderResult:
         """Размещение рыночного ордера"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
         side = "BUY" if is_buy else "SELL"
 
         try:
@@ -44,70 +78,188 @@ class HyperliquidOrderExecutor(IOrderExecutor):
             # Размещение ордера
             self.logger.info(f"[ORDER] Placing {side} {validated_size} {symbol} @ ${price:.4f}")
 
-            order_resp = self.exchange.market_open(symbol, is_buy=is_buy, sz=validated_size, px=price)
-
-            # Парсинг ответа
-            if order_resp and order_resp.get('status') == 'ok':
-                statuses = order_resp.get('response', {}).get('data', {}).get('statuses', [])
-                if statuses:
-                    status = statuses[0]
-                    if status.get('type') == 'success':
-                        # Успешное размещение
-                        order_id = None
-                        if 'resting' in status:
-                            order_id = status['resting'].get('oid')
-
-                        duration = time.time() - operation_start
-                        self.logger.info(f"[ORDER] SUCCESS: {side} {validated_size} {symbol} in {duration:.3f}s")
-
-                        return OrderResult(
-                            success=True,
-                            order_id=order_id,
-                            filled_size=validated_size,
-                            avg_price=price
-                        )
-                    else:
-                        error_msg = status.get('msg', 'Unknown error')
-                        self.logger.error(f"[ORDER] FAILED: {error_msg}")
-                        self.logger.error(f"[ORDER] Full status: {status}")
-                        return OrderResult(
-                            success=False,
-                            error_message=error_msg
-                        )
-                else:
-                    self.logger.error(f"[ORDER] No statuses in response: {order_resp}")
-                    return OrderResult(
-                        success=False,
-                        error_message="No statuses in response"
-                    )
+            if not _ORDER_SEM.acquire(timeout=_BULKHEAD_TIMEOUT):
+                self.logger.warning(f"[ORDER] Bulkhead full, rejecting {side} {symbol}")
+                return OrderResult(success=False, error_message="bulkhead full")
+
+            try:
+                # Повторяем только транзиентные сетевые сбои; отказ валидации
+                # приходит в теле ответа и повтора не вызывает
+                order_resp = self._open_breaker.call(
+                    retry_transient,
+                    lambda: self.exchange.market_open(symbol, is_buy=is_buy, sz=validated_size, px=price),
+                    logger=self.logger
+                )
+            finally:
+                _ORDER_SEM.release()
+
+            # Парсинг ответа: счастливый путь — прямые subscript-обращения
+            # без промежуточных пустых dict; except-ветка холодная
+            try:
+                status = order_resp['response']['data']['statuses'][0]
+            except (KeyError, IndexError, TypeError):
+                self.logger.error(f"[ORDER] Unexpected response: {order_resp}")
+                return OrderResult(
+                    success=False,
+                    error_message=f"Unexpected response: {order_resp}"
+                )
+
+            if order_resp.get('status') != 'ok' or status.get('type') != 'success':
+                error_msg = status.get('msg', 'Unknown error')
+                self.logger.error(f"[ORDER] FAILED: {error_msg}")
+                self.logger.error(f"[ORDER] Full status: {status}")
+                return OrderResult(
+                    success=False,
+                    error_message=error_msg
+                )
+
+            # Успешное размещение
+            order_id = status.get('resting', {}).get('oid')
+
+            duration = time.monotonic() - operation_start
+            self.logger.info(f"[ORDER] SUCCESS: {side} {validated_size} {symbol} in {duration:.3f}s")
 
-            # Неожиданный ответ
-            self.logger.error(f"[ORDER] Unexpected response: {order_resp}")
+            return OrderResult(
+                success=True,
+                order_id=order_id,
+                filled_size=validated_size,
+                avg_price=price
+            )
+
+        except CircuitOpenError:
+            self.logger.warning(f"[ORDER] Circuit open, rejecting {side} {symbol} without network call")
             return OrderResult(
                 success=False,
-                error_message=f"Unexpected response: {order_resp}"
+                error_message="circuit open"
             )
 
         except Exception as e:
-            duration = time.time() - operation_start
-            self.logger.error(f"[ORDER] Exception after {duration:.3f}s: {e}")
-            self.logger.error(traceback.format_exc())
+            duration = time.monotonic() - operation_start
+            # exc_info=True: traceback форматируется лениво и только если
+            # обработчик реально пишет запись — важно при шторме ошибок
+            self.logger.error("[ORDER] Exception after %.3fs: %s", duration, e, exc_info=True)
             return OrderResult(
                 success=False,
                 error_message=str(e)
             )
 
+    def place_market_orders_batch(self, orders: List[Tuple[str, bool, float, float]]) -> Dict[str, OrderResult]:
+        """Батчевое размещение рыночных ордеров.
+
+        Как и при закрытии, сначала пробуем один подписанный bulk-запрос
+        (одна ECDSA-подпись и один round-trip на весь план ребалансировки);
+        при недоступности батча падаем на параллельное размещение по символам.
+        """
+        if not orders:
+            return {}
+
+        # Валидация до отправки: невалидные ноги получают отказ без сети,
+        # остальные уходят в батч уже с квантованными размерами
+        results: Dict[str, OrderResult] = {}
+        validated: List[Tuple[str, bool, float, float]] = []
+        for symbol, is_buy, size, price in orders:
+            is_valid, validated_size, error_msg = self.validate_order_size(symbol, size)
+            if not is_valid:
+                self.logger.warning(f"[ORDER] Validation failed for {symbol}: {error_msg}")
+                results[symbol] = OrderResult(
+                    success=False,
+                    error_message=f"Order validation failed: {error_msg}"
+                )
+            else:
+                validated.append((symbol, is_buy, validated_size, price))
+
+        if not validated:
+            return results
+
+        batch_results = self._place_batch_bulk(validated)
+        if batch_results is None:
+            batch_results = self._place_batch_threaded(validated)
+        results.update(batch_results)
+        return results
+
+    def _place_batch_bulk(self, orders: List[Tuple[str, bool, float, float]]) -> Optional[Dict[str, OrderResult]]:
+        """Батчевое размещение через bulk_orders; None — сигнал к фолбэку"""
+        if not hasattr(self.exchange, 'bulk_orders'):
+            return None
+
+        try:
+            # IoC-ордера с агрессивной ценой — эквивалент market_open,
+            # но одним подписанным payload'ом на весь план
+            order_requests = []
+            for symbol, is_buy, size, _ in orders:
+                px = self.exchange._slippage_price(symbol, is_buy, 0.05)
+                order_requests.append({
+                    "coin": symbol,
+                    "is_buy": is_buy,
+                    "sz": size,
+                    "limit_px": px,
+                    "order_type": {"limit": {"tif": "Ioc"}},
+                    "reduce_only": False,
+                })
+
+            resp = self.exchange.bulk_orders(order_requests)
+
+            if not resp or resp.get('status') != 'ok':
+                self.logger.warning(f"[ORDER] Bulk placement rejected, falling back: {resp}")
+                return None
+
+            statuses = resp.get('response', {}).get('data', {}).get('statuses', [])
+            if len(statuses) != len(orders):
+                self.logger.warning("[ORDER] Bulk placement returned partial statuses, falling back")
+                return None
+
+            results = {}
+            for (symbol, _, size, price), status in zip(orders, statuses):
+                if 'error' in status:
+                    results[symbol] = OrderResult(success=False, error_message=status['error'])
+                else:
+                    order_id = status.get('filled', {}).get('oid') or status.get('resting', {}).get('oid')
+                    results[symbol] = OrderResult(
+                        success=True,
+                        order_id=order_id,
+                        filled_size=size,
+                        avg_price=price
+                    )
+            return results
+
+        except Exception as e:
+            self.logger.warning(f"[ORDER] Bulk placement failed, falling back to per-symbol: {e}")
+            return None
+
+    def _place_batch_threaded(self, orders: List[Tuple[str, bool, float, float]]) -> Dict[str, OrderResult]:
+        """Параллельное размещение по символам в пуле потоков (фолбэк)"""
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=min(16, len(orders)), thread_name_prefix="order") as executor:
+            future_to_symbol = {
+                executor.submit(self.place_market_order, symbol, is_buy, size, price): symbol
+                for symbol, is_buy, size, price in orders
+            }
+
+            for future in as_completed(future_to_symbol):
+                results[future_to_symbol[future]] = future.result()
+
+        return results
+
     def close_position(self, symbol: str) -> OrderResult:
         """Закрытие позиции"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
 
         try:
             self.logger.info(f"[ORDER] Closing position for {symbol}")
 
-            resp = self.exchange.market_close(symbol)
+            if not _ORDER_SEM.acquire(timeout=_BULKHEAD_TIMEOUT):
+                self.logger.warning(f"[ORDER] Bulkhead full, rejecting close of {symbol}")
+                return OrderResult(success=False, error_message="bulkhead full")
+
+            try:
+                resp = self._close_breaker.call(
+                    retry_transient, lambda: self.exchange.market_close(symbol), logger=self.logger)
+            finally:
+                _ORDER_SEM.release()
 
             if resp and resp.get('status') == 'ok':
-                duration = time.time() - operation_start
+                duration = time.monotonic() - operation_start
                 self.logger.info(f"[ORDER] Position closed for {symbol} in {duration:.3f}s")
 
                 return OrderResult(
@@ -122,8 +274,15 @@ class HyperliquidOrderExecutor(IOrderExecutor):
                     error_message=error_msg
                 )
 
+        except CircuitOpenError:
+            self.logger.warning(f"[ORDER] Circuit open, rejecting close of {symbol} without network call")
+            return OrderResult(
+                success=False,
+                error_message="circuit open"
+            )
+
         except Exception as e:
-            duration = time.time() - operation_start
+            duration = time.monotonic() - operation_start
             self.logger.error(f"[ORDER] Close exception after {duration:.3f}s: {e}")
             return OrderResult(
                 success=False,
@@ -133,38 +292,107 @@ class HyperliquidOrderExecutor(IOrderExecutor):
     def validate_order_size(self, symbol: str, size: float) -> Tuple[bool, float, str]:
         """Валидация размера ордера"""
         try:
-            asset_params = self.asset_meta.get(symbol)
-            if asset_params is None:
+            params = self._validation_table.get(symbol)
+            if params is None:
                 return False, 0.0, f"No meta info for {symbol}"
 
-            min_sz = float(asset_params.get('minSz', 10 ** (-int(asset_params.get('szDecimals', 6)))))
-            sz_step = float(asset_params.get('szStep', 10 ** (-int(asset_params.get('szDecimals', 6)))))
-            sz_decimals = int(asset_params.get('szDecimals', 6))
+            min_sz, step_ticks, scale = params
 
-            # Округление размера
-            rounded_size = round(round(size / sz_step) * sz_step, sz_decimals)
+            # Квантование в целых тиках: одно FP-деление на входе, одно на
+            # выходе, между ними — целочисленная арифметика без накопления шума
+            rounded_ticks = int(round(size * scale / step_ticks)) * step_ticks
+            rounded_size = rounded_ticks / scale
 
             if rounded_size < min_sz:
                 return False, rounded_size, f"Size {rounded_size} < minSz {min_sz}"
 
-            self.logger.debug(f"[ORDER] Validated {symbol}: {size} -> {rounded_size}")
+            self.logger.debug("[ORDER] Validated %s: %s -> %s", symbol, size, rounded_size)
             return True, rounded_size, ""
 
         except Exception as e:
             return False, 0.0, f"Validation error: {e}"
 
     def close_all_positions(self, positions: Dict[str, float]) -> Dict[str, OrderResult]:
-        """Закрытие всех позиций"""
-        results = {}
+        """Закрытие всех позиций.
+
+        Сначала пробуем один батчевый подписанный запрос (одна ECDSA-подпись
+        и один round-trip на все позиции); при недоступности батча падаем
+        обратно на параллельное закрытие по символам.
+        """
+        to_close = {symbol: size for symbol, size in positions.items() if abs(size) > 1e-8}
+        if not to_close:
+            return {}
+
+        results = self._close_all_bulk(to_close)
+        if results is None:
+            results = self._close_all_threaded(to_close)
+
+        for symbol, result in results.items():
+            if result.success:
+                self.logger.info(f"[ORDER] Closed {symbol} position")
+            else:
+                self.logger.error(f"[ORDER] Failed to close {symbol}: {result.error_message}")
+
+        return results
+
+    def _close_all_bulk(self, to_close: Dict[str, float]) -> Optional[Dict[str, OrderResult]]:
+        """Батчевое закрытие через bulk_orders; None — сигнал к фолбэку"""
+        if not hasattr(self.exchange, 'bulk_orders'):
+            return None
+
+        try:
+            # Reduce-only IoC-ордера с агрессивной ценой — эквивалент
+            # market_close, но одним подписанным payload'ом
+            symbols = list(to_close)
+            order_requests = []
+            for symbol, size in to_close.items():
+                is_buy = size < 0
+                px = self.exchange._slippage_price(symbol, is_buy, 0.05)
+                order_requests.append({
+                    "coin": symbol,
+                    "is_buy": is_buy,
+                    "sz": abs(size),
+                    "limit_px": px,
+                    "order_type": {"limit": {"tif": "Ioc"}},
+                    "reduce_only": True,
+                })
 
-        for symbol, size in positions.items():
-            if abs(size) > 1e-8:
-                result = self.close_position(symbol)
-                results[symbol] = result
+            resp = self.exchange.bulk_orders(order_requests)
 
-                if result.success:
-                    self.logger.info(f"[ORDER] Closed {symbol} position")
+            if not resp or resp.get('status') != 'ok':
+                self.logger.warning(f"[ORDER] Bulk close rejected, falling back: {resp}")
+                return None
+
+            statuses = resp.get('response', {}).get('data', {}).get('statuses', [])
+            if len(statuses) != len(symbols):
+                self.logger.warning("[ORDER] Bulk close returned partial statuses, falling back")
+                return None
+
+            results = {}
+            for symbol, status in zip(symbols, statuses):
+                if 'error' in status:
+                    results[symbol] = OrderResult(success=False, error_message=status['error'])
                 else:
-                    self.logger.error(f"[ORDER] Failed to close {symbol}: {result.error_message}")
+                    order_id = status.get('filled', {}).get('oid') or status.get('resting', {}).get('oid')
+                    results[symbol] = OrderResult(success=True, order_id=order_id)
+            return results
+
+        except Exception as e:
+            self.logger.warning(f"[ORDER] Bulk close failed, falling back to per-symbol: {e}")
+            return None
+
+    def _close_all_threaded(self, to_close: Dict[str, float]) -> Dict[str, OrderResult]:
+        """Параллельное закрытие по символам в пуле потоков.
+
+        I/O-bound HTTP-вызовы перекрываются, а не складываются; конкурентность
+        ограничена, чтобы не упереться в rate limit биржи.
+        """
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=min(16, len(to_close)), thread_name_prefix="close") as executor:
+            future_to_symbol = {executor.submit(self.close_position, symbol): symbol for symbol in to_close}
+
+            for future in as_completed(future_to_symbol):
+                results[future_to_symbol[future]] = future.result()
 
         return results
@@ -4,11 +4,14 @@
 """
 
 import time
-from typing import Dict
-from collections import defaultdict, deque
+from typing import Dict, Tuple
+from collections import defaultdict
 from dataclasses import dataclass, field
+
+import numpy as np
 from logger_config import setup_unified_logger
 from interfaces import IPerformanceMonitor
+from network_utils import get_breaker_states
 
 
 @dataclass
@@ -20,7 +23,13 @@ class OperationMetrics:
     total_latency: float = 0.0
     max_latency: float = 0.0
     min_latency: float = float('inf')
-    recent_latencies: deque = field(default_factory=lambda: deque(maxlen=100))
+    # Кольцевой буфер последних латентностей: вставка за O(1) без аллокаций,
+    # перцентили считаются одной векторной редукцией по срезу
+    _ring: np.ndarray = field(default_factory=lambda: np.empty(100, dtype=np.float32))
+    _ring_i: int = 0
+    _ring_n: int = 0
+    # Скользящая сумма кольца, поддерживается инкрементально в track_latency
+    recent_sum: float = 0.0
 
     @property
     def success_rate(self) -> float:
@@ -35,9 +44,16 @@ class OperationMetrics:
     @property
     def recent_avg_latency(self) -> float:
         """Средняя латентность последних операций"""
-        if not self.recent_latencies:
+        if self._ring_n == 0:
             return 0.0
-        return sum(self.recent_latencies) / len(self.recent_latencies)
+        return self.recent_sum / self._ring_n
+
+    def percentiles(self) -> Tuple[float, float, float]:
+        """Перцентили p50/p95/p99 последних латентностей (для тюнинга таймаутов)"""
+        if self._ring_n == 0:
+            return (0.0, 0.0, 0.0)
+        p50, p95, p99 = np.percentile(self._ring[:self._ring_n], [50, 95, 99])
+        return (float(p50), float(p95), float(p99))
 
 
 @dataclass
@@ -71,6 +87,11 @@ class PerformanceMonitor(IPerformanceMonitor):
         self.rebalances_executed = 0
         self.errors_count = 0
 
+        # Кэш собранных метрик: скрейпер на 1Hz и log_performance_summary
+        # делят один словарь вместо пересборки по всем операциям
+        self._metrics_cache = None
+        self._metrics_ts = 0.0
+
         self.logger.info("[INIT] Performance monitor initialized")
 
     def track_latency(self, operation: str, duration: float) -> None:
@@ -79,7 +100,18 @@ class PerformanceMonitor(IPerformanceMonitor):
 
         metrics.total_calls += 1
         metrics.total_latency += duration
-        metrics.recent_latencies.append(duration)
+
+        # Пишем в кольцо, поддерживая скользящую сумму: вытесняемое значение
+        # вычитается перед перезаписью слота
+        ring = metrics._ring
+        i = metrics._ring_i
+        if metrics._ring_n == 100:
+            metrics.recent_sum -= float(ring[i])
+        else:
+            metrics._ring_n += 1
+        ring[i] = duration
+        metrics._ring_i = (i + 1) % 100
+        metrics.recent_sum += duration
 
         if duration > metrics.max_latency:
             metrics.max_latency = duration
@@ -88,11 +120,13 @@ class PerformanceMonitor(IPerformanceMonitor):
 
         self.api_calls_count += 1
 
-        # Логируем медленные операции
-        if duration > 5.0:  # Более 5 секунд
-            self.logger.warning(f"[PERF] Slow operation {operation}: {duration:.3f}s")
-        elif duration > 2.0:  # Более 2 секунд
-            self.logger.info(f"[PERF] {operation}: {duration:.3f}s")
+        # Логируем медленные операции: быстрый путь (duration <= 2s)
+        # ограничивается единственным сравнением
+        if duration > 2.0:
+            if duration > 5.0:  # Более 5 секунд
+                self.logger.warning(f"[PERF] Slow operation {operation}: {duration:.3f}s")
+            else:  # Более 2 секунд
+                self.logger.info(f"[PERF] {operation}: {duration:.3f}s")
 
     def track_success_rate(self, operation: str, success: bool) -> None:
         """Отслеживание успешности операций"""
@@ -104,10 +138,12 @@ class PerformanceMonitor(IPerformanceMonitor):
             metrics.failed_calls += 1
             self.errors_count += 1
 
-        # Логируем проблемы с успешностью
-        current_success_rate = metrics.success_rate
-        if metrics.total_calls >= 10 and current_success_rate < 90:
-            self.logger.warning(f"[PERF] Low success rate for {operation}: {current_success_rate:.1f}%")
+        # Логируем проблемы с успешностью; success_rate (свойство с делением)
+        # вычисляем только когда выборка достаточна
+        if metrics.total_calls >= 10:
+            current_success_rate = metrics.success_rate
+            if current_success_rate < 90:
+                self.logger.warning(f"[PERF] Low success rate for {operation}: {current_success_rate:.1f}%")
 
     def track_pnl(self, unrealized: float, realized: float) -> None:
         """Отслеживание PnL"""
@@ -122,12 +158,12 @@ class PerformanceMonitor(IPerformanceMonitor):
         if unrealized < self.pnl_metrics.min_unrealized:
             self.pnl_metrics.min_unrealized = unrealized
 
-        self.logger.debug(f"[PNL] Unrealized: ${unrealized:.2f}, Realized: ${realized:.2f}")
+        self.logger.debug("[PNL] Unrealized: $%.2f, Realized: $%.2f", unrealized, realized)
 
     def track_order_placed(self) -> None:
         """Отслеживание размещенных ордеров"""
         self.orders_placed += 1
-        self.logger.debug(f"[PERF] Orders placed: {self.orders_placed}")
+        self.logger.debug("[PERF] Orders placed: %d", self.orders_placed)
 
     def track_rebalance_executed(self) -> None:
         """Отслеживание выполненных ребалансировок"""
@@ -135,7 +171,11 @@ class PerformanceMonitor(IPerformanceMonitor):
         self.logger.info(f"[PERF] Rebalances executed: {self.rebalances_executed}")
 
     def get_metrics(self) -> Dict[str, float]:
-        """Получение метрик производительности"""
+        """Получение метрик производительности (кэш на 1 секунду)"""
+        now = time.monotonic()
+        if self._metrics_cache is not None and now - self._metrics_ts < 1.0:
+            return self._metrics_cache
+
         uptime = time.time() - self.start_time
 
         metrics = {
@@ -160,10 +200,18 @@ class PerformanceMonitor(IPerformanceMonitor):
                 f"{prefix}success_rate": op_metrics.success_rate,
                 f"{prefix}avg_latency": op_metrics.avg_latency,
                 f"{prefix}recent_avg_latency": op_metrics.recent_avg_latency,
+                f"{prefix}p95_latency": op_metrics.percentiles()[1],
                 f"{prefix}max_latency": op_metrics.max_latency,
                 f"{prefix}total_calls": op_metrics.total_calls
             })
 
+        # Состояния circuit breakers по эндпоинтам
+        for name, state in get_breaker_states().items():
+            metrics[f"breaker_{name}_state"] = state
+
+        self._metrics_cache = metrics
+        self._metrics_ts = now
+
         return metrics
 
     def log_performance_summary(self) -> None:
@@ -202,5 +250,7 @@ class PerformanceMonitor(IPerformanceMonitor):
         self.orders_placed = 0
         self.rebalances_executed = 0
         self.errors_count = 0
+        self._metrics_cache = None
+        self._metrics_ts = 0.0
 
         self.logger.info("[PERF] Metrics reset")
@@ -4,11 +4,34 @@
 """
 
 import time
-from typing import Dict, List
+import threading
+import logging
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
 from hyperliquid.info import Info
 from hyperliquid.utils.constants import MAINNET_API_URL
 from logger_config import setup_unified_logger
 from interfaces import IPositionProvider, PositionInfo
+from network_utils import mount_shared_session, retry_transient, get_circuit_breaker
+from exceptions import NetworkError
+
+
+# Bulkhead для запросов чтения: отдельная квота от ордерных вызовов, чтобы
+# поллинг позиций/NAV оставался отзывчивым при всплеске торговой активности
+_QUERY_SEM = threading.BoundedSemaphore(4)
+
+# Сколько ждать свободный слот, прежде чем отказать fail-fast
+_BULKHEAD_TIMEOUT = 2.0
+
+# Возраст push-снимка, после которого websocket считается заглохшим
+# и чтения уходят обратно в REST
+_WS_STALE_AFTER = 10.0
+
+# Пустой снимок позиций: (поколение, метка времени, read-only view).
+# Поколение 0 означает "снимка нет"
+_EMPTY_POSITIONS_SNAPSHOT = (0, 0.0, MappingProxyType({}))
 
 
 class HyperliquidPositionProvider(IPositionProvider):
@@ -17,28 +40,127 @@ class HyperliquidPositionProvider(IPositionProvider):
     def __init__(self, account_address: str):
         self.logger = setup_unified_logger("position_provider")
         self.info = Info(MAINNET_API_URL, skip_ws=True)
+        mount_shared_session(self.info)  # Общий пул соединений: без TLS handshake на каждый user_state
         self.account_address = account_address
-        self._position_cache = {}
+        # Единый кэш user_state: все публичные методы — локальные проекции
+        # одного ответа API, а не три одинаковых round-trip за цикл
+        self._user_state_cache = None
         self._cache_timestamp = 0
         self._cache_ttl = 5  # Кэш на 5 секунд для позиций
+        # Распарсенная проекция позиций текущего user_state: неизменяемый
+        # кортеж (поколение, метка, view), подменяемый одним атомарным
+        # присваиванием — читатели видят согласованный снимок без блокировки
+        self._positions_snapshot: Tuple[int, float, Mapping[str, float]] = _EMPTY_POSITIONS_SNAPSHOT
+        self._state_breaker = get_circuit_breaker("info.user_state")
+
+        # Push-снимок по websocket: позиции и маржа обновляются событиями
+        # биржи, чтение становится бесплатным; REST остается фолбэком
+        # на случай заглохшего сокета
+        self._ws_lock = threading.RLock()
+        self._ws_positions: Optional[Mapping[str, float]] = None
+        self._ws_summary: Optional[Dict[str, float]] = None
+        self._last_ws_update = 0.0
+        self._ws_info = None
+        self._start_user_subscription()
 
         self.logger.info("[INIT] Position provider initialized")
 
+    def _start_user_subscription(self) -> None:
+        """Подписка на push-обновления состояния аккаунта (best-effort)"""
+        try:
+            self._ws_info = Info(MAINNET_API_URL, skip_ws=False)
+            self._ws_info.subscribe(
+                {"type": "webData2", "user": self.account_address}, self._on_user_update)
+            self.logger.info("Subscribed to user state updates via websocket")
+        except Exception as e:
+            # Без подписки остаемся на REST-поллинге с TTL-кэшем
+            self._ws_info = None
+            self.logger.warning("User websocket subscription unavailable, falling back to REST: %s", e)
+
+    def _on_user_update(self, payload) -> None:
+        """Обновление снимков позиций и маржи из push-события"""
+        try:
+            data = payload.get('data', payload) if isinstance(payload, dict) else {}
+            state = data.get('clearinghouseState') or data
+            asset_positions = state.get('assetPositions')
+            if asset_positions is None:
+                return
+
+            positions = {}
+            for pos in asset_positions:
+                item = pos.get('position', {})
+                coin = item.get('coin')
+                if coin:
+                    positions[coin] = float(item.get('szi', 0.0))
+
+            margin_summary = state.get('marginSummary', {})
+            summary = {
+                'account_value': float(margin_summary.get('accountValue', 0.0)),
+                'total_margin_used': float(margin_summary.get('totalMarginUsed', 0.0)),
+                'total_raw_usd': float(margin_summary.get('totalRawUsd', 0.0)),
+                'withdrawable': float(margin_summary.get('withdrawable', 0.0))
+            }
+
+            with self._ws_lock:
+                self._ws_positions = MappingProxyType(positions)
+                self._ws_summary = summary
+                self._last_ws_update = time.monotonic()
+
+        except Exception as e:
+            self.logger.warning("Failed to process user state update: %s", e)
+
+    def _ws_snapshot_fresh(self) -> bool:
+        """Свежи ли push-данные; протухший сокет деградирует в REST-поллинг"""
+        return (
+            self._ws_positions is not None and
+            time.monotonic() - self._last_ws_update < _WS_STALE_AFTER
+        )
+
     def _is_cache_valid(self) -> bool:
-        """Проверка валидности кэша"""
-        return time.time() - self._cache_timestamp < self._cache_ttl
+        """Проверка валидности кэша (монотонные часы устойчивы к переводу времени)"""
+        return time.monotonic() - self._cache_timestamp < self._cache_ttl
+
+    def _get_user_state(self) -> dict:
+        """Получение user_state с кэшированием — единственная точка запроса к API"""
+        if self._user_state_cache is not None and self._is_cache_valid():
+            self.logger.debug("[CACHE] User state cache hit")
+            return self._user_state_cache
 
-    def get_positions(self) -> Dict[str, float]:
-        """Получение текущих позиций с кэшированием"""
-        operation_start = time.time()
+        if not _QUERY_SEM.acquire(timeout=_BULKHEAD_TIMEOUT):
+            raise NetworkError("Query bulkhead full")
 
         try:
-            # Проверяем кэш
-            if self._is_cache_valid() and self._position_cache:
-                self.logger.debug("[CACHE] Positions cache hit")
-                return self._position_cache.copy()
+            user_state = self._state_breaker.call(
+                retry_transient,
+                lambda: self.info.user_state(self.account_address),
+                logger=self.logger
+            )
+        finally:
+            _QUERY_SEM.release()
+        self._user_state_cache = user_state
+        # Старый снимок помечаем протухшим (нулевая метка): проекция
+        # пересоберется лениво из свежего user_state
+        seq, _, snap = self._positions_snapshot
+        self._positions_snapshot = (seq, 0.0, snap)
+        self._cache_timestamp = time.monotonic()
+        return user_state
+
+    def get_positions(self) -> Mapping[str, float]:
+        """Получение текущих позиций с кэшированием (read-only view)"""
+        operation_start = time.monotonic()
 
-            user_state = self.info.user_state(self.account_address)
+        try:
+            # Самый горячий путь: свежий push-снимок из websocket
+            if self._ws_snapshot_fresh():
+                return self._ws_positions
+
+            # Снимок читаем одним разыменованием: кортеж подменяется целиком,
+            # поэтому поколение, метка и view всегда согласованы между собой
+            seq, snap_ts, snap = self._positions_snapshot
+            if seq and time.monotonic() - snap_ts < self._cache_ttl:
+                return snap
+
+            user_state = self._get_user_state()
             asset_positions = user_state.get('assetPositions', [])
             positions = {}
 
@@ -49,19 +171,20 @@ class HyperliquidPositionProvider(IPositionProvider):
                 if coin:
                     positions[coin] = float(sz)
 
-            # Обновляем кэш
-            self._position_cache = positions
-            self._cache_timestamp = time.time()
+            snap = MappingProxyType(positions)
+            self._positions_snapshot = (seq + 1, time.monotonic(), snap)
 
-            duration = time.time() - operation_start
-            self.logger.debug(f"[PERF] Get positions completed in {duration:.3f}s")
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get positions completed in %.3fs", duration)
 
-            # Логируем открытые позиции
-            open_positions = {k: v for k, v in positions.items() if abs(v) > 1e-8}
-            if open_positions:
-                self.logger.debug(f"[POSITIONS] Open: {open_positions}")
+            # Логируем открытые позиции — dict comprehension материализуем
+            # только если DEBUG реально включен
+            if self.logger.isEnabledFor(logging.DEBUG):
+                open_positions = {k: v for k, v in positions.items() if abs(v) > 1e-8}
+                if open_positions:
+                    self.logger.debug("[POSITIONS] Open: %s", open_positions)
 
-            return positions
+            return snap
 
         except Exception as e:
             self.logger.error(f"[ERROR] Failed to get positions: {e}")
@@ -69,10 +192,10 @@ class HyperliquidPositionProvider(IPositionProvider):
 
     def get_position_details(self) -> List[PositionInfo]:
         """Получение детальной информации о позициях"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
 
         try:
-            user_state = self.info.user_state(self.account_address)
+            user_state = self._get_user_state()
             asset_positions = user_state.get('assetPositions', [])
             position_details = []
 
@@ -103,8 +226,8 @@ class HyperliquidPositionProvider(IPositionProvider):
                             leverage=leverage
                         ))
 
-            duration = time.time() - operation_start
-            self.logger.debug(f"[PERF] Get position details completed in {duration:.3f}s")
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get position details completed in %.3fs", duration)
 
             return position_details
 
@@ -112,12 +235,66 @@ class HyperliquidPositionProvider(IPositionProvider):
             self.logger.error(f"[ERROR] Failed to get position details: {e}")
             return []
 
+    def get_positions_soa(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Получение открытых позиций колонками (SoA) для векторной математики"""
+        operation_start = time.monotonic()
+
+        try:
+            user_state = self._get_user_state()
+            asset_positions = user_state.get('assetPositions', [])
+
+            symbols, sizes, pnls, margins, leverages = [], [], [], [], []
+
+            for pos in asset_positions:
+                position_info = pos.get('position', {})
+                coin = position_info.get('coin')
+
+                if coin:
+                    size = float(position_info.get('szi', 0.0))
+                    if abs(size) <= 1e-8:  # Только открытые позиции
+                        continue
+
+                    # Получаем leverage
+                    leverage_info = position_info.get('leverage')
+                    if leverage_info and isinstance(leverage_info, dict):
+                        leverage = float(leverage_info.get('value', 1.0))
+                    elif leverage_info:
+                        leverage = float(leverage_info)
+                    else:
+                        leverage = 1.0
+
+                    symbols.append(coin)
+                    sizes.append(size)
+                    pnls.append(float(position_info.get('unrealizedPnl', 0.0)))
+                    margins.append(float(position_info.get('marginUsed', 0.0)))
+                    leverages.append(leverage)
+
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get positions SoA completed in %.3fs", duration)
+
+            return (
+                np.array(symbols, dtype=object),
+                np.array(sizes, dtype=np.float64),
+                np.array(pnls, dtype=np.float64),
+                np.array(margins, dtype=np.float64),
+                np.array(leverages, dtype=np.float64)
+            )
+
+        except Exception as e:
+            self.logger.error(f"[ERROR] Failed to get positions SoA: {e}")
+            empty = np.array([], dtype=np.float64)
+            return np.array([], dtype=object), empty, empty, empty, empty
+
     def get_account_summary(self) -> Dict[str, float]:
         """Получение сводки по аккаунту"""
-        operation_start = time.time()
+        operation_start = time.monotonic()
 
         try:
-            user_state = self.info.user_state(self.account_address)
+            # Свежий push-снимок избавляет от REST round-trip
+            if self._ws_snapshot_fresh() and self._ws_summary is not None:
+                return dict(self._ws_summary)
+
+            user_state = self._get_user_state()
             margin_summary = user_state.get('marginSummary', {})
 
             summary = {
@@ -127,8 +304,8 @@ class HyperliquidPositionProvider(IPositionProvider):
                 'withdrawable': float(margin_summary.get('withdrawable', 0.0))
             }
 
-            duration = time.time() - operation_start
-            self.logger.debug(f"[PERF] Get account summary completed in {duration:.3f}s")
+            duration = time.monotonic() - operation_start
+            self.logger.debug("[PERF] Get account summary completed in %.3fs", duration)
             self.logger.debug(
                 f"[ACCOUNT] NAV: ${summary['account_value']:.2f}, Margin: ${summary['total_margin_used']:.2f}")
 
@@ -140,6 +317,9 @@ class HyperliquidPositionProvider(IPositionProvider):
 
     def invalidate_cache(self) -> None:
         """Принудительная очистка кэша"""
-        self._position_cache.clear()
+        self._user_state_cache = None
+        # Одна атомарная подмена вместо пары clear()+timestamp: параллельный
+        # читатель видит либо старый согласованный снимок, либо пустой
+        self._positions_snapshot = _EMPTY_POSITIONS_SNAPSHOT
         self._cache_timestamp = 0
-        self.logger.debug("[CACHE] Position cache invalidated")
+        self.logger.debug("[CACHE] User state cache invalidated")
@@ -3,14 +3,31 @@
 Реализует интерфейс IRiskManager
 """
 
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, List, Tuple
 from hyperliquid.exchange import Exchange
 from hyperliquid.info import Info
 from hyperliquid.utils.constants import MAINNET_API_URL
 from eth_account import Account
+import numpy as np
 from logger_config import setup_unified_logger
 from interfaces import IRiskManager
+from market_data_provider import HyperliquidMarketDataProvider
+from network_utils import mount_shared_session
+
+@dataclass(slots=True)
+class PositionView:
+    """Нормализованная позиция из user_state: один парс кормит всех читателей"""
+    coin: str
+    size: float
+    leverage: float
+    margin_used: float
+    unrealized_pnl: float
+
 
 class HyperliquidRiskManager(IRiskManager):
     """Менеджер рисков для Hyperliquid"""
@@ -21,29 +38,119 @@ class HyperliquidRiskManager(IRiskManager):
         self.account_address = account_address
         self.exchange = Exchange(self.wallet, base_url=MAINNET_API_URL, account_address=account_address)
         self.info = Info(MAINNET_API_URL, skip_ws=True)
+        # Общий пул keep-alive соединений: циклы update_leverage/market_close
+        # не платят TCP+TLS handshake на каждый вызов
+        mount_shared_session(self.exchange)
+        mount_shared_session(self.info)
         self.asset_meta = asset_meta or {}
-        
+
+        # Параметры валидации константны для символа — материализуем таблицу
+        # один раз, как в order_executor: шаг в целых тиках при масштабе
+        # 10^szDecimals, квантование без FP-дрейфа и без перепарсинга меты.
+        # Ключи интернируем: горячий lookup сравнивает указатели, не байты
+        self._validation_table: Dict[str, Tuple[float, int, int]] = {}
+        for symbol, params in self.asset_meta.items():
+            symbol = sys.intern(symbol)
+            sz_decimals = int(params.get('szDecimals', 6))
+            default_step = 10 ** (-sz_decimals)
+            scale = 10 ** sz_decimals
+            sz_step = float(params.get('szStep', default_step))
+            step_ticks = max(1, int(round(sz_step * scale)))
+            self._validation_table[symbol] = (
+                float(params.get('minSz', default_step)),
+                step_ticks,
+                scale
+            )
+
         # Настройка задержек API
         delays = api_delays or {}
         self.order_processing_delay = delays.get('order_processing', 3)
         self.leverage_update_delay = delays.get('leverage_update', 2)
         self.position_check_delay = delays.get('position_check', 1)
-        
+
+        # Короткий кэш user_state: force_leverage_compliance дергает несколько
+        # читателей подряд, и один HTTP round-trip кормит их всех
+        self._user_state_cache = (0.0, None)
+
         self.logger.info("[INIT] Risk manager initialized")
-    
+
+    @cached_property
+    def market_data(self) -> HyperliquidMarketDataProvider:
+        """Провайдер рыночных данных: один на весь менеджер вместо
+        конструирования нового клиента (и нового Info) на каждый вызов"""
+        return HyperliquidMarketDataProvider()
+
+    def _get_user_state(self, max_age: float = 1.0) -> dict:
+        """Получение user_state с коротким TTL-кэшем — одна точка запроса к API"""
+        ts, payload = self._user_state_cache
+        if payload is not None and time.monotonic() - ts < max_age:
+            return payload
+
+        payload = self.info.user_state(self.account_address)
+        self._user_state_cache = (time.monotonic(), payload)
+        return payload
+
+    def _invalidate_user_state(self) -> None:
+        """Сброс кэша user_state после мутаций (ордера, смена плечей)"""
+        self._user_state_cache = (0.0, None)
+
+    def _parse_positions(self, user_state: dict) -> List[PositionView]:
+        """Единственный проход по assetPositions: вся нормализация полей
+        (включая dict/scalar ветку leverage) живет здесь, а не в четырех копиях"""
+        views = []
+        append = views.append  # Связанный метод: без повторного атрибут-лукапа на позицию
+        for pos in user_state.get('assetPositions', []):
+            position_info = pos.get('position', {})
+            coin = position_info.get('coin')
+            if not coin:
+                continue
+
+            leverage_info = position_info.get('leverage')
+            if leverage_info and isinstance(leverage_info, dict):
+                leverage = float(leverage_info.get('value', 1.0))
+            elif leverage_info:
+                leverage = float(leverage_info)
+            else:
+                leverage = 1.0
+
+            append(PositionView(
+                coin=coin,
+                size=float(position_info.get('szi', 0.0)),
+                leverage=leverage,
+                margin_used=float(position_info.get('marginUsed', 0.0)),
+                unrealized_pnl=float(position_info.get('unrealizedPnl', 0.0))
+            ))
+        return views
+
+    def _wait_until(self, predicate, timeout: float, interval: float = 0.2) -> bool:
+        """Адаптивное ожидание вместо фиксированного sleep.
+
+        Опрашиваем свежий user_state и выходим, как только сервер отразил
+        изменения; worst case равен прежней фиксированной задержке
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if predicate(self._get_user_state(max_age=0)):
+                    return True
+            except Exception as e:
+                self.logger.debug("[LEVERAGE] Wait predicate error: %s", e)
+            time.sleep(interval)
+        return False
+
     def update_leverage(self, symbol: str, leverage: int) -> bool:
         """Обновление плеча для символа"""
         operation_start = time.time()
         
         try:
-            self.logger.info(f"[LEVERAGE] Updating {symbol} leverage to {leverage}x")
+            self.logger.info("[LEVERAGE] Updating %s leverage to %sx", symbol, leverage)
             
             response = self.exchange.update_leverage(leverage, symbol, is_cross=True)
             
             duration = time.time() - operation_start
             
             if response and response.get('status') == 'ok':
-                self.logger.info(f"[LEVERAGE] Successfully updated {symbol} to {leverage}x in {duration:.3f}s")
+                self.logger.info("[LEVERAGE] Successfully updated %s to %sx in %.3fs", symbol, leverage, duration)
                 return True
             else:
                 self.logger.error(f"[LEVERAGE] Failed to update {symbol}: {response}")
@@ -59,28 +166,10 @@ class HyperliquidRiskManager(IRiskManager):
         operation_start = time.time()
         
         try:
-            user_state = self.info.user_state(self.account_address)
-            asset_positions = user_state.get('assetPositions', [])
-            
-            leverages = {}
-            
-            for pos in asset_positions:
-                position_info = pos.get('position', {})
-                coin = position_info.get('coin')
-                
-                if coin:
-                    leverage_info = position_info.get('leverage')
-                    if leverage_info and isinstance(leverage_info, dict):
-                        leverage = float(leverage_info.get('value', 1.0))
-                    elif leverage_info:
-                        leverage = float(leverage_info)
-                    else:
-                        leverage = 1.0
-                    
-                    leverages[coin] = leverage
-            
+            leverages = {p.coin: p.leverage for p in self._parse_positions(self._get_user_state())}
+
             duration = time.time() - operation_start
-            self.logger.debug(f"[LEVERAGE] Retrieved leverages in {duration:.3f}s: {leverages}")
+            self.logger.debug("[LEVERAGE] Retrieved leverages in %.3fs: %s", duration, leverages)
             
             return leverages
             
@@ -89,6 +178,17 @@ class HyperliquidRiskManager(IRiskManager):
             self.logger.error(f"[LEVERAGE] Failed to get leverages after {duration:.3f}s: {e}")
             return {}
     
+    def _is_fully_compliant(self, required_btc: int, required_shorts: int, shorts: List[str]) -> bool:
+        """Быстрая проверка "все ли плечи на месте" без сборки полного словаря.
+
+        Генератор обрывается на первом расхождении — в типичном (компактном)
+        случае горячий мониторинговый цикл не строит ни списков, ни логов
+        """
+        leverages = self.get_current_leverages()
+        if int(round(leverages.get('BTC', 1.0))) != required_btc:
+            return False
+        return all(int(round(leverages.get(symbol, 1.0))) == required_shorts for symbol in shorts)
+
     def check_leverage_compliance(self, required_btc: int, required_shorts: int, shorts: List[str]) -> Dict[str, bool]:
         """Проверка соответствия плечей требованиям"""
         operation_start = time.time()
@@ -97,17 +197,16 @@ class HyperliquidRiskManager(IRiskManager):
             current_leverages = self.get_current_leverages()
             compliance = {}
             
-            # Проверяем BTC
-            btc_leverage = current_leverages.get('BTC', 1.0)
-            compliance['BTC'] = abs(btc_leverage - required_btc) < 0.01
-            
+            # Требуемые плечи целые, и биржа репортит их целыми — сравниваем
+            # в int без эпсилон-арифметики
+            compliance['BTC'] = int(round(current_leverages.get('BTC', 1.0))) == required_btc
+
             # Проверяем шорты
             for symbol in shorts:
-                symbol_leverage = current_leverages.get(symbol, 1.0)
-                compliance[symbol] = abs(symbol_leverage - required_shorts) < 0.01
+                compliance[symbol] = int(round(current_leverages.get(symbol, 1.0))) == required_shorts
             
             duration = time.time() - operation_start
-            self.logger.debug(f"[LEVERAGE] Compliance check completed in {duration:.3f}s")
+            self.logger.debug("[LEVERAGE] Compliance check completed in %.3fs", duration)
             
             # Логируем несоответствия
             non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
@@ -127,14 +226,18 @@ class HyperliquidRiskManager(IRiskManager):
         
         try:
             self.logger.info("[LEVERAGE] Starting FULL leverage compliance process")
-            
-            compliance = self.check_leverage_compliance(required_btc, required_shorts, shorts)
-            non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
-            
-            if not non_compliant:
+
+            # Начинаем со свежего снимка: решение о полном сбросе не должно
+            # опираться на данные прошлого цикла
+            self._invalidate_user_state()
+            if self._is_fully_compliant(required_btc, required_shorts, shorts):
                 self.logger.info("[LEVERAGE] All leverages already compliant")
                 return True
-            
+
+            # Полный словарь нужен только ради диагностики расхождений
+            compliance = self.check_leverage_compliance(required_btc, required_shorts, shorts)
+            non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
+
             self.logger.warning(f"[LEVERAGE] Detected non-compliant symbols: {non_compliant}")
             self.logger.info("[LEVERAGE] Starting FULL RESET: Close -> Set Leverage -> Reopen")
             
@@ -175,42 +278,36 @@ class HyperliquidRiskManager(IRiskManager):
     def _save_portfolio_state(self, shorts: List[str]) -> Dict:
         """Сохранение текущего состояния портфеля"""
         try:
-            user_state = self.info.user_state(self.account_address)
-            asset_positions = user_state.get('assetPositions', [])
+            user_state = self._get_user_state()
+            positions = self._parse_positions(user_state)
             margin_summary = user_state.get('marginSummary', {})
-            
+
+            # Получаем цены одним запросом через общий провайдер
+            prices = self.market_data.get_prices(['BTC'] + shorts)
+
+            # Агрегация колонками: стоимости и суммы по маскам считает NumPy,
+            # Python-уровню остается одна сборка словаря
+            open_positions = [p for p in positions if abs(p.size) > 1e-8]
+            coins = np.array([p.coin for p in open_positions], dtype=object)
+            # Шорты конвертируем в массив один раз, а не внутри np.isin
+            shorts_arr = np.asarray(shorts, dtype=object)
+            sizes = np.abs(np.fromiter((p.size for p in open_positions), dtype=np.float64, count=len(open_positions)))
+            px = np.fromiter((prices.get(p.coin, 0.0) for p in open_positions), dtype=np.float64, count=len(open_positions))
+            values = sizes * px
+
             state = {
                 'nav': float(margin_summary.get('accountValue', 0.0)),
-                'positions': {},
-                'total_btc_value': 0.0,
-                'total_shorts_value': 0.0
+                # Снимок цен едет дальше по restore-цепочке: открытия не
+                # перезапрашивают то, что уже получено секунду назад
+                'prices': prices,
+                'positions': {
+                    p.coin: {'size': p.size, 'value': float(v), 'price': float(pr)}
+                    for p, v, pr in zip(open_positions, values, px)
+                },
+                'total_btc_value': float(values[coins == 'BTC'].sum()),
+                'total_shorts_value': float(values[np.isin(coins, shorts_arr)].sum())
             }
             
-            # Получаем цены
-            from market_data_provider import HyperliquidMarketDataProvider
-            market_data = HyperliquidMarketDataProvider()
-            prices = market_data.get_prices(['BTC'] + shorts)
-            
-            for pos in asset_positions:
-                position_info = pos.get('position', {})
-                coin = position_info.get('coin')
-                size = float(position_info.get('szi', 0.0))
-                
-                if coin and abs(size) > 1e-8:
-                    price = prices.get(coin, 0.0)
-                    value = abs(size) * price
-                    
-                    state['positions'][coin] = {
-                        'size': size,
-                        'value': value,
-                        'price': price
-                    }
-                    
-                    if coin == 'BTC':
-                        state['total_btc_value'] += value
-                    elif coin in shorts:
-                        state['total_shorts_value'] += value
-            
             self.logger.info(f"[LEVERAGE] Saved state: NAV=${state['nav']:.2f}, BTC=${state['total_btc_value']:.2f}, Shorts=${state['total_shorts_value']:.2f}")
             return state
             
@@ -221,72 +318,150 @@ class HyperliquidRiskManager(IRiskManager):
     def _close_all_positions(self) -> bool:
         """Закрытие всех позиций"""
         try:
-            user_state = self.info.user_state(self.account_address)
-            asset_positions = user_state.get('assetPositions', [])
-            
-            positions_to_close = []
-            for pos in asset_positions:
-                position_info = pos.get('position', {})
-                coin = position_info.get('coin')
-                size = float(position_info.get('szi', 0.0))
-                
-                if coin and abs(size) > 1e-8:
-                    positions_to_close.append((coin, size))
-            
+            positions_to_close = [
+                (p.coin, p.size)
+                for p in self._parse_positions(self._get_user_state())
+                if abs(p.size) > 1e-8
+            ]
+
             if not positions_to_close:
                 self.logger.info("[LEVERAGE] No positions to close")
                 return True
             
-            self.logger.info(f"[LEVERAGE] Closing {len(positions_to_close)} positions")
+            self.logger.info("[LEVERAGE] Closing %d positions", len(positions_to_close))
+
+            # Сначала пробуем один батчевый подписанный запрос на все позиции;
+            # при недоступности батча закрываем по символам параллельно
+            success = self._close_all_bulk(positions_to_close)
+            if success is None:
+                with ThreadPoolExecutor(max_workers=8, thread_name_prefix="risk_close") as executor:
+                    futures = {
+                        executor.submit(self._close_one_position, coin, size): coin
+                        for coin, size in positions_to_close
+                    }
+                    success = all(future.result() for future in as_completed(futures))
+
+
+            # Ждем обработки ордеров: выходим, как только позиций не осталось,
+            # вместо фиксированного sleep на конфигурируемую задержку
+            delay = self.order_processing_delay
+            if not self._wait_until(
+                    lambda state: all(abs(p.size) <= 1e-8 for p in self._parse_positions(state)),
+                    timeout=delay):
+                self.logger.warning("[LEVERAGE] Positions still open after %ss wait", delay)
+            # Позиции изменились — кэшированный user_state больше не актуален
+            self._invalidate_user_state()
+            return success
             
-            success = True
+        except Exception as e:
+            self.logger.error(f"[LEVERAGE] Failed to close positions: {e}")
+            return False
+
+    def _close_all_bulk(self, positions_to_close: List[Tuple[str, float]]):
+        """Батчевое закрытие через bulk_orders; None — сигнал к фолбэку.
+
+        Reduce-only IoC-ордера с агрессивной ценой — эквивалент market_close,
+        но одна ECDSA-подпись и один round-trip на весь портфель
+        """
+        if not hasattr(self.exchange, 'bulk_orders'):
+            return None
+
+        try:
+            order_requests = []
             for coin, size in positions_to_close:
-                try:
-                    # Закрываем позицию рыночным ордером
-                    is_buy = size < 0  # Если позиция короткая, покупаем для закрытия
-                    close_size = abs(size)
-                    
-                    self.logger.info(f"[LEVERAGE] Closing {coin}: {'BUY' if is_buy else 'SELL'} {close_size:.6f}")
-                    
-                    # Используем market_close для закрытия позиций
-                    response = self.exchange.market_close(coin)
-                    
-                    if response and response.get('status') == 'ok':
-                        self.logger.info(f"[LEVERAGE] Successfully closed {coin} position")
-                    else:
-                        self.logger.error(f"[LEVERAGE] Failed to close {coin}: {response}")
-                        success = False
-                        
-                except Exception as e:
-                    self.logger.error(f"[LEVERAGE] Exception closing {coin}: {e}")
+                is_buy = size < 0
+                px = self.exchange._slippage_price(coin, is_buy, 0.05)
+                order_requests.append({
+                    "coin": coin,
+                    "is_buy": is_buy,
+                    "sz": abs(size),
+                    "limit_px": px,
+                    "order_type": {"limit": {"tif": "Ioc"}},
+                    "reduce_only": True,
+                })
+
+            resp = self.exchange.bulk_orders(order_requests)
+
+            if not resp or resp.get('status') != 'ok':
+                self.logger.warning(f"[LEVERAGE] Bulk close rejected, falling back: {resp}")
+                return None
+
+            statuses = resp.get('response', {}).get('data', {}).get('statuses', [])
+            if len(statuses) != len(positions_to_close):
+                self.logger.warning("[LEVERAGE] Bulk close returned partial statuses, falling back")
+                return None
+
+            success = True
+            for (coin, _), status in zip(positions_to_close, statuses):
+                if 'error' in status:
+                    self.logger.error(f"[LEVERAGE] Failed to close {coin}: {status['error']}")
                     success = False
-            
-            # Ждем обработки ордеров (конфигурируемая задержка)
-            delay = getattr(self, 'order_processing_delay', 3)
-            time.sleep(delay)
+                else:
+                    self.logger.info("[LEVERAGE] Successfully closed %s position", coin)
             return success
-            
+
         except Exception as e:
-            self.logger.error(f"[LEVERAGE] Failed to close positions: {e}")
+            self.logger.warning(f"[LEVERAGE] Bulk close failed, falling back to per-symbol: {e}")
+            return None
+
+    def _close_one_position(self, coin: str, size: float) -> bool:
+        """Закрытие одной позиции рыночным ордером (единица работы для пула)"""
+        try:
+            is_buy = size < 0  # Если позиция короткая, покупаем для закрытия
+            close_size = abs(size)
+
+            self.logger.info("[LEVERAGE] Closing %s: %s %.6f", coin, "BUY" if is_buy else "SELL", close_size)
+
+            # Используем market_close для закрытия позиций
+            response = self.exchange.market_close(coin)
+
+            if response and response.get('status') == 'ok':
+                self.logger.info("[LEVERAGE] Successfully closed %s position", coin)
+                return True
+            else:
+                self.logger.error(f"[LEVERAGE] Failed to close {coin}: {response}")
+                return False
+
+        except Exception as e:
+            self.logger.error(f"[LEVERAGE] Exception closing {coin}: {e}")
             return False
     
     def _set_all_leverages(self, required_btc: int, required_shorts: int, shorts: List[str]) -> bool:
         """Установка всех плечей"""
         try:
-            success = True
-            
-            # Устанавливаем BTC leverage
-            if not self.update_leverage('BTC', required_btc):
-                success = False
-            
-            # Устанавливаем leverage для шортов
-            for symbol in shorts:
-                if not self.update_leverage(symbol, required_shorts):
-                    success = False
-            
-            # Ждем обновления настроек (конфигурируемая задержка)
-            delay = getattr(self, 'leverage_update_delay', 2)
-            time.sleep(delay)
+            targets = [('BTC', required_btc)] + [(symbol, required_shorts) for symbol in shorts]
+
+            # Каждый update_leverage — отдельный подписанный запрос, и action
+            # API биржи не принимает их пачкой. Минимизируем число подписей
+            # иначе: шлем только реально расходящиеся плечи
+            current = self.get_current_leverages()
+            pending = [
+                (symbol, lev) for symbol, lev in targets
+                if int(round(current.get(symbol, 0.0))) != lev
+            ]
+
+            if not pending:
+                self.logger.info("[LEVERAGE] All leverages already at target, nothing to update")
+                return True
+
+            # Оставшиеся вызовы независимы: пул потоков сводит wall time
+            # к max() вместо sum(), сокеты переиспользуются из общего пула
+            with ThreadPoolExecutor(max_workers=8, thread_name_prefix="risk_lev") as executor:
+                futures = [executor.submit(self.update_leverage, symbol, lev) for symbol, lev in pending]
+                success = all(future.result() for future in as_completed(futures))
+
+            # Ждем, пока сервер отразит новые плечи (отсутствующие в user_state
+            # символы считаем применившимися — без позиции плечо не репортится)
+            delay = self.leverage_update_delay
+
+            def _leverages_applied(state) -> bool:
+                leverages = {p.coin: p.leverage for p in self._parse_positions(state)}
+                return all(int(round(leverages.get(symbol, lev))) == lev for symbol, lev in pending)
+
+            if not self._wait_until(_leverages_applied, timeout=delay):
+                self.logger.warning("[LEVERAGE] Leverages not confirmed after %ss wait", delay)
+            # Плечи изменились — кэшированный user_state больше не актуален
+            self._invalidate_user_state()
             return success
             
         except Exception as e:
@@ -305,7 +480,8 @@ class HyperliquidRiskManager(IRiskManager):
             if not saved_state.get('positions') or saved_state.get('total_btc_value', 0) == 0:
                 self.logger.info("[LEVERAGE] No positions to restore, creating initial positions based on strategy")
                 shorts_symbols = ['ZK', 'STRK']  # Используем стандартные шорты
-                return self._create_initial_positions(available_for_trading, btc_leverage, shorts_leverage, shorts_symbols)
+                return self._create_initial_positions(available_for_trading, btc_leverage, shorts_leverage, shorts_symbols,
+                                                       prices=saved_state.get('prices'))
             
             # Рассчитываем целевые размеры позиций на основе сохраненного соотношения
             total_btc_value = saved_state['total_btc_value']
@@ -315,7 +491,8 @@ class HyperliquidRiskManager(IRiskManager):
             if total_value == 0:
                 self.logger.info("[LEVERAGE] No value to restore, creating initial positions")
                 shorts_symbols = ['ZK', 'STRK']  # Используем стандартные шорты
-                return self._create_initial_positions(available_for_trading, btc_leverage, shorts_leverage, shorts_symbols)
+                return self._create_initial_positions(available_for_trading, btc_leverage, shorts_leverage, shorts_symbols,
+                                                       prices=saved_state.get('prices'))
             
             # Восстанавливаем пропорции
             btc_ratio = total_btc_value / total_value
@@ -327,19 +504,30 @@ class HyperliquidRiskManager(IRiskManager):
             self.logger.info(f"[LEVERAGE] Restoring: BTC=${target_btc_value:.2f}, Shorts=${target_shorts_value:.2f}")
             
             success = True
-            
+
+            # Цены уже сняты в _save_portfolio_state; дозапрашиваем только
+            # если снимка в состоянии нет
+            shorts_positions = {k: v for k, v in saved_state['positions'].items() if k != 'BTC'}
+            prices = saved_state.get('prices') or self.market_data.get_prices(['BTC'] + list(shorts_positions))
+
             # Восстанавливаем BTC позицию
             if target_btc_value > 5.0:  # Минимум $5
-                if not self._open_position('BTC', target_btc_value, btc_leverage, True):
+                if not self._open_position('BTC', target_btc_value, btc_leverage, True,
+                                           price=prices.get('BTC', 0.0)):
                     success = False
-            
+
             # Восстанавливаем позиции шортов
-            shorts_positions = {k: v for k, v in saved_state['positions'].items() if k != 'BTC'}
             if shorts_positions and target_shorts_value > 5.0:
                 shorts_per_symbol = target_shorts_value / len(shorts_positions)
-                
-                for symbol in shorts_positions.keys():
-                    if not self._open_position(symbol, shorts_per_symbol, shorts_leverage, False):
+
+                # Открытия шортов независимы — перекрываем round-trip'ы в пуле
+                with ThreadPoolExecutor(max_workers=8, thread_name_prefix="risk_open") as executor:
+                    futures = [
+                        executor.submit(self._open_position, symbol, shorts_per_symbol, shorts_leverage, False,
+                                        price=prices.get(symbol, 0.0))
+                        for symbol in shorts_positions.keys()
+                    ]
+                    if not all(future.result() for future in as_completed(futures)):
                         success = False
             
             return success
@@ -348,15 +536,18 @@ class HyperliquidRiskManager(IRiskManager):
             self.logger.error(f"[LEVERAGE] Failed to restore positions: {e}")
             return False
     
-    def _open_position(self, symbol: str, target_value: float, leverage: int, is_buy: bool) -> bool:
-        """Открытие позиции с заданным размером и плечом"""
+    def _open_position(self, symbol: str, target_value: float, leverage: int, is_buy: bool,
+                       price: float = 0.0) -> bool:
+        """Открытие позиции с заданным размером и плечом.
+
+        Цену можно передать снаружи (батчевый прайс-фетч перед циклом
+        открытий); без нее делаем одиночный запрос через общий провайдер
+        """
         try:
-            # Получаем текущую цену
-            from market_data_provider import HyperliquidMarketDataProvider
-            market_data = HyperliquidMarketDataProvider()
-            prices = market_data.get_prices([symbol])
-            price = prices.get(symbol, 0.0)
-            
+            if not price:
+                prices = self.market_data.get_prices([symbol])
+                price = prices.get(symbol, 0.0)
+
             if price == 0:
                 self.logger.error(f"[LEVERAGE] No price for {symbol}")
                 return False
@@ -370,13 +561,13 @@ class HyperliquidRiskManager(IRiskManager):
                 self.logger.error(f"[LEVERAGE] Size validation failed for {symbol}: {error_msg}")
                 return False
             
-            self.logger.info(f"[LEVERAGE] Opening {symbol}: {'BUY' if is_buy else 'SELL'} {size:.6f} @ ${price:.4f} (${target_value:.2f})")
+            self.logger.info("[LEVERAGE] Opening %s: %s %.6f @ $%.4f ($%.2f)", symbol, "BUY" if is_buy else "SELL", size, price, target_value)
             
             # Используем market_open для открытия позиций
             response = self.exchange.market_open(symbol, is_buy=is_buy, sz=size, px=price)
             
             if response and response.get('status') == 'ok':
-                self.logger.info(f"[LEVERAGE] Successfully opened {symbol} position")
+                self.logger.info("[LEVERAGE] Successfully opened %s position", symbol)
                 return True
             else:
                 self.logger.error(f"[LEVERAGE] Failed to open {symbol}: {response}")
@@ -386,7 +577,8 @@ class HyperliquidRiskManager(IRiskManager):
             self.logger.error(f"[LEVERAGE] Exception opening {symbol}: {e}")
             return False
     
-    def _create_initial_positions(self, available_for_trading: float, btc_leverage: int, shorts_leverage: int, shorts_symbols: List[str]) -> bool:
+    def _create_initial_positions(self, available_for_trading: float, btc_leverage: int, shorts_leverage: int,
+                                  shorts_symbols: List[str], prices: Dict[str, float] = None) -> bool:
         """Создание начальных позиций согласно стратегии (ratio_target = 2.0)"""
         try:
             # Согласно стратегии: BTC:Shorts = 2:1 по марже
@@ -401,11 +593,16 @@ class HyperliquidRiskManager(IRiskManager):
             self.logger.info(f"[LEVERAGE] Creating initial positions: BTC margin=${target_btc_margin:.2f}, Shorts margin=${target_shorts_margin:.2f}")
             
             success = True
-            
+
+            # Используем переданный снимок цен; без него — один запрос на все символы
+            if not prices:
+                prices = self.market_data.get_prices(['BTC'] + shorts_symbols)
+
             # Открываем BTC позицию (лонг)
             if target_btc_margin > 5.0:  # Минимум $5
                 btc_position_value = target_btc_margin * btc_leverage  # Размер позиции = маржа * плечо
-                if not self._open_position('BTC', btc_position_value, btc_leverage, True):
+                if not self._open_position('BTC', btc_position_value, btc_leverage, True,
+                                           price=prices.get('BTC', 0.0)):
                     self.logger.error("[LEVERAGE] Failed to open BTC position")
                     success = False
                 else:
@@ -415,13 +612,23 @@ class HyperliquidRiskManager(IRiskManager):
             if target_shorts_margin > 5.0:  # Минимум $5
                 shorts_margin_per_symbol = target_shorts_margin / len(shorts_symbols)
                 shorts_position_value_per_symbol = shorts_margin_per_symbol * shorts_leverage
-                
-                for symbol in shorts_symbols:
-                    if not self._open_position(symbol, shorts_position_value_per_symbol, shorts_leverage, False):
-                        self.logger.error(f"[LEVERAGE] Failed to open {symbol} short position")
-                        success = False
-                    else:
-                        self.logger.info(f"[LEVERAGE] Opened {symbol} short: ${shorts_position_value_per_symbol:.2f} (margin: ${shorts_margin_per_symbol:.2f})")
+
+                # Шорты открываем параллельно: вызовы независимы и IO-bound
+                with ThreadPoolExecutor(max_workers=8, thread_name_prefix="risk_open") as executor:
+                    futures = {
+                        executor.submit(
+                            self._open_position, symbol, shorts_position_value_per_symbol, shorts_leverage, False,
+                            price=prices.get(symbol, 0.0)
+                        ): symbol
+                        for symbol in shorts_symbols
+                    }
+                    for future in as_completed(futures):
+                        symbol = futures[future]
+                        if not future.result():
+                            self.logger.error(f"[LEVERAGE] Failed to open {symbol} short position")
+                            success = False
+                        else:
+                            self.logger.info(f"[LEVERAGE] Opened {symbol} short: ${shorts_position_value_per_symbol:.2f} (margin: ${shorts_margin_per_symbol:.2f})")
             
             if success:
                 self.logger.info("[LEVERAGE] ✅ All initial positions created successfully")
@@ -437,10 +644,10 @@ class HyperliquidRiskManager(IRiskManager):
     def get_position_details_with_leverage(self) -> Dict[str, Dict]:
         """Получение детальной информации о позициях с leverage"""
         try:
-            user_state = self.info.user_state(self.account_address)
-            asset_positions = user_state.get('assetPositions', [])
+            user_state = self._get_user_state()
+            positions = self._parse_positions(user_state)
             margin_summary = user_state.get('marginSummary', {})
-            
+
             details = {
                 'margin_summary': {
                     'account_value': float(margin_summary.get('accountValue', 0.0)),
@@ -453,37 +660,20 @@ class HyperliquidRiskManager(IRiskManager):
             
             btc_margin_used = 0.0
             shorts_margin_used = 0.0
-            
-            for pos in asset_positions:
-                position_info = pos.get('position', {})
-                coin = position_info.get('coin')
-                
-                if coin:
-                    size = float(position_info.get('szi', 0.0))
-                    unrealized_pnl = float(position_info.get('unrealizedPnl', 0.0))
-                    margin_used = float(position_info.get('marginUsed', 0.0))
-                    
-                    # Получаем leverage
-                    leverage_info = position_info.get('leverage')
-                    if leverage_info and isinstance(leverage_info, dict):
-                        leverage = float(leverage_info.get('value', 1.0))
-                    elif leverage_info:
-                        leverage = float(leverage_info)
-                    else:
-                        leverage = 1.0
-                    
-                    details['positions'][coin] = {
-                        'size': size,
-                        'unrealized_pnl': unrealized_pnl,
-                        'margin_used': margin_used,
-                        'leverage': leverage
-                    }
-                    
-                    # Суммируем маржу
-                    if coin == 'BTC':
-                        btc_margin_used += margin_used
-                    else:
-                        shorts_margin_used += margin_used
+
+            for p in positions:
+                details['positions'][p.coin] = {
+                    'size': p.size,
+                    'unrealized_pnl': p.unrealized_pnl,
+                    'margin_used': p.margin_used,
+                    'leverage': p.leverage
+                }
+
+                # Суммируем маржу
+                if p.coin == 'BTC':
+                    btc_margin_used += p.margin_used
+                else:
+                    shorts_margin_used += p.margin_used
             
             details['margin_summary']['btc_margin_used'] = btc_margin_used
             details['margin_summary']['shorts_margin_used'] = shorts_margin_used
@@ -497,21 +687,21 @@ class HyperliquidRiskManager(IRiskManager):
     def _validate_order_size(self, symbol: str, size: float) -> Tuple[bool, float, str]:
         """Валидация размера ордера согласно требованиям биржи"""
         try:
-            asset_params = self.asset_meta.get(symbol)
-            if asset_params is None:
+            params = self._validation_table.get(symbol)
+            if params is None:
                 return False, 0.0, f"No meta info for {symbol}"
-            
-            min_sz = float(asset_params.get('minSz', 10 ** (-int(asset_params.get('szDecimals', 6)))))
-            sz_step = float(asset_params.get('szStep', 10 ** (-int(asset_params.get('szDecimals', 6)))))
-            sz_decimals = int(asset_params.get('szDecimals', 6))
-            
-            # Округление размера согласно szStep
-            rounded_size = round(round(size / sz_step) * sz_step, sz_decimals)
-            
+
+            min_sz, step_ticks, scale = params
+
+            # Квантование в целых тиках: одно FP-деление на входе, одно на
+            # выходе, между ними — целочисленная арифметика
+            rounded_ticks = int(round(size * scale / step_ticks)) * step_ticks
+            rounded_size = rounded_ticks / scale
+
             if rounded_size < min_sz:
                 return False, rounded_size, f"Size {rounded_size} < minSz {min_sz}"
             
-            self.logger.debug(f"[LEVERAGE] Validated {symbol}: {size:.8f} -> {rounded_size:.8f}")
+            self.logger.debug("[LEVERAGE] Validated %s: %.8f -> %.8f", symbol, size, rounded_size)
             return True, rounded_size, ""
             
         except Exception as e:
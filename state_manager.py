@@ -1,18 +1,35 @@
-import json
+import atexit
+import os
 import time
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+
+import json_utils
+import numpy as np
 from logger_config import setup_unified_logger
 
 
-@dataclass
-class NavRecord:
-    """Запись NAV"""
-    date: str
-    nav: float
+def _attach_to_dict(cls):
+    """Генерирует плоский _to_dict на этапе определения класса.
+
+    dataclasses.asdict рекурсивно deepcopy-ит каждое поле; для тысяч
+    записей истории это доминирующая цена save_state. Сгенерированный
+    метод — один литерал словаря без копий и getattr-циклов
+    """
+    body = ", ".join(f"{f.name!r}: self.{f.name}" for f in fields(cls))
+    namespace = {}
+    exec(f"def _to_dict(self):\n    return {{{body}}}", namespace)
+    cls._to_dict = namespace['_to_dict']
+    return cls
+
 
+# Ретенция NAV-истории: кольцевой буфер фиксированной емкости, старые
+# записи перезаписываются — память процесса ограничена независимо от аптайма
+_NAV_RETENTION = 100_000
 
-@dataclass
+
+@_attach_to_dict
+@dataclass(slots=True)
 class CommissionRecord:
     """Запись комиссии"""
     date: str
@@ -27,7 +44,8 @@ class CommissionRecord:
     nav_after_commission: float = 0.0
 
 
-@dataclass
+@_attach_to_dict
+@dataclass(slots=True)
 class FundingRecord:
     """Запись фандинга"""
     time: int
@@ -45,13 +63,37 @@ class StateManager:
         self.state_file = state_file
         self.config_file = config_file
 
+        # Append-only истории живут в JSONL-сайдкарах: новая запись — одна
+        # дописанная строка, а не пересериализация всего хвоста в state.json
+        self.commission_sidecar = 'commission_history.jsonl'
+        self.funding_sidecar = 'funding_paid_history.jsonl'
+        self._commission_fp = None
+        self._funding_fp = None
+        atexit.register(self._close_sidecars)
+
+        # Дебаунс записи: мутаторы только взводят dirty-флаг, а реальный
+        # дамп state.json делает maybe_save не чаще раза в несколько секунд
+        self._dirty = False
+        self._last_save_ts = 0.0
+        atexit.register(self._save_if_dirty)
+
+        # Текстовая метка времени с секундной точностью: strftime зовется
+        # не чаще раза в секунду, остальные записи берут кэшированную строку
+        self._ts_cache_second = -1
+        self._ts_cache_str = ''
+
         # Загружаем конфигурацию
         self.config = self._load_config()
 
-        # Инициализируем состояние
-        self.nav_history: List[NavRecord] = []
+        # Инициализируем состояние.
+        # NAV-история — колоночный кольцевой буфер (int64 метки + float64
+        # значения): бесплатный доступ к последней записи и жесткая ретенция
+        self._init_nav_ring([])
         self.positions: Dict[str, float] = {}
-        self.funding_history: Dict[str, List[float]] = {}
+        # Ставки фандинга храним колонками: растущий float64-буфер на символ
+        # плюс счетчик длины — агрегации идут одной векторной редукцией
+        self._funding_buf: Dict[str, np.ndarray] = {}
+        self._funding_len: Dict[str, int] = {}
         self.rebalance_events: List[Dict[str, Any]] = []
         self.commission_history: List[CommissionRecord] = []
         self.funding_paid_history: List[FundingRecord] = []
@@ -62,23 +104,120 @@ class StateManager:
     def _load_config(self) -> dict:
         """Загрузка конфигурации"""
         try:
-            with open(self.config_file) as f:
-                return json.load(f)
+            return json_utils.load_file(self.config_file)
         except Exception as e:
             self.logger.error(f"Failed to load config: {e}")
             raise
 
+
+    def _init_nav_ring(self, records: List[dict]) -> None:
+        """Материализация кольцевого буфера NAV из легаси-списка записей"""
+        self._nav_ts = np.zeros(_NAV_RETENTION, dtype=np.int64)
+        self._nav_val = np.zeros(_NAV_RETENTION, dtype=np.float64)
+        self._nav_head = 0
+        self._nav_len = 0
+        for record in records[-_NAV_RETENTION:]:
+            try:
+                ts = int(time.mktime(time.strptime(record['date'], '%Y-%m-%d %H:%M:%S')))
+            except (KeyError, TypeError, ValueError):
+                ts = 0
+            self._nav_push(ts, float(record.get('nav', 0.0)))
+
+    def _nav_push(self, ts: int, nav: float) -> None:
+        """Запись NAV в следующий слот кольца (перезапись самой старой)"""
+        self._nav_ts[self._nav_head] = ts
+        self._nav_val[self._nav_head] = nav
+        self._nav_head = (self._nav_head + 1) % _NAV_RETENTION
+        if self._nav_len < _NAV_RETENTION:
+            self._nav_len += 1
+
+    def _nav_history_dicts(self) -> List[dict]:
+        """NAV-история в хронологическом порядке в формате state.json"""
+        order = (np.arange(self._nav_len) + self._nav_head - self._nav_len) % _NAV_RETENTION
+        return [
+            {'date': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(ts))), 'nav': float(nav)}
+            for ts, nav in zip(self._nav_ts[order], self._nav_val[order])
+        ]
+
+    def _init_funding_buffers(self, funding_lists: Dict[str, List[float]]) -> None:
+        """Материализация колоночных буферов фандинга из списков"""
+        self._funding_buf = {}
+        self._funding_len = {}
+        for symbol, rates in funding_lists.items():
+            n = len(rates)
+            buf = np.empty(max(8, n * 2), dtype=np.float64)
+            if n:
+                buf[:n] = rates
+            self._funding_buf[symbol] = buf
+            self._funding_len[symbol] = n
+
+    def _sidecar_fp(self, attr: str, path: str):
+        """Ленивое открытие сайдкара на дозапись с крупным буфером"""
+        fp = getattr(self, attr)
+        if fp is None:
+            fp = open(path, 'ab', buffering=64 * 1024)
+            setattr(self, attr, fp)
+        return fp
+
+    def _append_sidecar(self, attr: str, path: str, record) -> None:
+        """Дозапись одной JSONL-строки в сайдкар истории"""
+        try:
+            self._sidecar_fp(attr, path).write(json_utils.dumps(record._to_dict()) + b"\n")
+        except Exception as e:
+            self.logger.error(f"Failed to append to {path}: {e}")
+
+    def _iter_sidecar(self, path: str):
+        """Потоковый разбор JSONL-сайдкара: записи выдаются по одной, без
+        промежуточного списка dict'ов — пик памяти на загрузке ограничен
+        только финальным списком датаклассов; битые строки пропускаются"""
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json_utils.loads(line)
+                    except Exception as e:
+                        self.logger.warning(f"Skipping corrupt sidecar line in {path}: {e}")
+        except FileNotFoundError:
+            return
+
+    def _close_sidecars(self) -> None:
+        """Сброс буферов и закрытие сайдкаров (атексит/шатдаун)"""
+        for attr in ('_commission_fp', '_funding_fp'):
+            fp = getattr(self, attr, None)
+            if fp is not None:
+                try:
+                    fp.close()
+                except Exception:
+                    pass
+                setattr(self, attr, None)
+
+    @staticmethod
+    def _commission_from_dict(record: dict) -> 'CommissionRecord':
+        """Сборка записи комиссии с заполнением отсутствующих полей"""
+        record.setdefault('commission_usd', None)
+        record.setdefault('nav_after_commission', 0.0)
+        record.setdefault('commission', None)
+        record.setdefault('commission_token', None)
+        record.setdefault('oid', None)
+        return CommissionRecord(**record)
+
+    @staticmethod
+    def _funding_from_dict(record: dict) -> 'FundingRecord':
+        """Сборка записи фандинга с заполнением отсутствующих полей"""
+        record.setdefault('funding_usd', None)
+        record.setdefault('endTime', record.get('time', 0))
+        return FundingRecord(**record)
+
     def load_state(self) -> bool:
         """Загрузка состояния из файла"""
         try:
-            with open(self.state_file) as f:
-                state = json.load(f)
+            state = json_utils.load_file(self.state_file)
 
-            # Загружаем NAV историю
-            self.nav_history = [
-                NavRecord(date=record['date'], nav=record['nav'])
-                for record in state.get('nav_history', [])
-            ]
+            # Загружаем NAV историю в кольцевой буфер (хвост в пределах ретенции)
+            self._init_nav_ring(state.get('nav_history', []))
 
             # Загружаем позиции
             self.positions = state.get('positions', {})
@@ -86,53 +225,62 @@ class StateManager:
                 # Инициализируем пустые позиции
                 symbols = ['BTC'] + self.config.get('shorts', [])
                 self.positions = {s: 0.0 for s in symbols}
+            self._rebuild_open_symbols()
 
-            # Загружаем историю фандинга
-            self.funding_history = state.get('funding_history', {})
-            if not self.funding_history:
+            # Загружаем историю фандинга в колоночные буферы
+            funding_lists = state.get('funding_history', {})
+            if not funding_lists:
                 symbols = ['BTC'] + self.config.get('shorts', [])
-                self.funding_history = {s: [] for s in symbols}
+                funding_lists = {s: [] for s in symbols}
+            self._init_funding_buffers(funding_lists)
 
             # Загружаем события ребалансировки
             self.rebalance_events = state.get('rebalance_events', [])
 
-            # Загружаем историю комиссий
-            commission_data = state.get('commission_history', [])
+            # Истории комиссий/фандинга: сайдкар авторитетен, если уже есть;
+            # иначе берем легаси-списки из state.json и мигрируем их в сайдкар
             self.commission_history = []
+            if os.path.exists(self.commission_sidecar):
+                commission_data = self._iter_sidecar(self.commission_sidecar)
+                migrate_commissions = False
+            else:
+                commission_data = state.get('commission_history', [])
+                migrate_commissions = bool(commission_data)
             for record in commission_data:
                 try:
-                    # Добавляем отсутствующие поля для обратной совместимости
-                    if 'commission_usd' not in record:
-                        record['commission_usd'] = None
-                    if 'nav_after_commission' not in record:
-                        record['nav_after_commission'] = 0.0
-                    if 'commission' not in record:
-                        record['commission'] = None
-                    if 'commission_token' not in record:
-                        record['commission_token'] = None
-                    if 'oid' not in record:
-                        record['oid'] = None
-
-                    self.commission_history.append(CommissionRecord(**record))
+                    self.commission_history.append(self._commission_from_dict(record))
                 except Exception as e:
                     self.logger.warning(f"Failed to load commission record: {e}")
                     continue
+            if migrate_commissions:
+                for record in self.commission_history:
+                    self._append_sidecar('_commission_fp', self.commission_sidecar, record)
 
-            # Загружаем историю фандинга
-            funding_data = state.get('funding_paid_history', [])
             self.funding_paid_history = []
+            if os.path.exists(self.funding_sidecar):
+                funding_data = self._iter_sidecar(self.funding_sidecar)
+                migrate_fundings = False
+            else:
+                funding_data = state.get('funding_paid_history', [])
+                migrate_fundings = bool(funding_data)
             for record in funding_data:
                 try:
-                    # Добавляем отсутствующие поля для обратной совместимости
-                    if 'funding_usd' not in record:
-                        record['funding_usd'] = None
-                    if 'endTime' not in record:
-                        record['endTime'] = record.get('time', 0)
-
-                    self.funding_paid_history.append(FundingRecord(**record))
+                    self.funding_paid_history.append(self._funding_from_dict(record))
                 except Exception as e:
                     self.logger.warning(f"Failed to load funding record: {e}")
                     continue
+            if migrate_fundings:
+                for record in self.funding_paid_history:
+                    self._append_sidecar('_funding_fp', self.funding_sidecar, record)
+
+            # Бегущие суммы инициализируем одним проходом при загрузке;
+            # дальше они поддерживаются инкрементально в мутаторах
+            self._total_commission_usd = sum(
+                r.commission_usd for r in self.commission_history if r.commission_usd)
+            self._total_funding_usd = sum(
+                r.funding_usd for r in self.funding_paid_history if r.funding_usd)
+            self._max_funding_end_time = max(
+                (r.endTime for r in self.funding_paid_history), default=0)
 
             self.logger.info("State loaded successfully")
             return True
@@ -149,27 +297,43 @@ class StateManager:
     def _initialize_empty_state(self):
         """Инициализация пустого состояния"""
         symbols = ['BTC'] + self.config.get('shorts', [])
-        self.nav_history = []
+        self._init_nav_ring([])
         self.positions = {s: 0.0 for s in symbols}
-        self.funding_history = {s: [] for s in symbols}
+        self._open_symbols = set()
+        self._init_funding_buffers({s: [] for s in symbols})
         self.rebalance_events = []
         self.commission_history = []
         self.funding_paid_history = []
+        self._total_commission_usd = 0.0
+        self._total_funding_usd = 0.0
+        self._max_funding_end_time = 0
 
     def save_state(self) -> bool:
         """Сохранение состояния в файл"""
         try:
+            # Горячее состояние: append-only истории комиссий/фандинга живут
+            # в JSONL-сайдкарах и в полный дамп не входят
             state = {
-                'nav_history': [asdict(record) for record in self.nav_history],
+                'nav_history': self._nav_history_dicts(),
                 'positions': self.positions,
-                'funding_history': self.funding_history,
-                'rebalance_events': self.rebalance_events,
-                'commission_history': [asdict(record) for record in self.commission_history],
-                'funding_paid_history': [asdict(record) for record in self.funding_paid_history]
+                'funding_history': {
+                    s: self._funding_buf[s][:self._funding_len[s]].tolist()
+                    for s in self._funding_buf
+                },
+                'rebalance_events': self.rebalance_events
             }
 
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f, indent=2)
+            # Атомарная подмена: читатели видят либо старый, либо новый
+            # state.json целиком, но никогда обрезанный
+            json_utils.dump_file(state, self.state_file, atomic=True)
+
+            # Досбрасываем буферы сайдкаров вместе с основным состоянием
+            for fp in (self._commission_fp, self._funding_fp):
+                if fp is not None:
+                    fp.flush()
+
+            self._dirty = False
+            self._last_save_ts = time.monotonic()
 
             self.logger.debug("State saved successfully")
             return True
@@ -178,23 +342,72 @@ class StateManager:
             self.logger.error(f"Failed to save state: {e}")
             return False
 
+    def maybe_save(self, min_interval: float = 5.0) -> bool:
+        """Дебаунс-сохранение: пишем на диск только при изменениях и не чаще
+        min_interval; финальная запись гарантируется atexit-хуком"""
+        if not self._dirty:
+            return False
+        if time.monotonic() - self._last_save_ts < min_interval:
+            return False
+        return self.save_state()
+
+    def _save_if_dirty(self) -> None:
+        """Финальный сброс несохраненных изменений (atexit)"""
+        if self._dirty:
+            self.save_state()
+
+    def _format_timestamp(self) -> str:
+        """Метка времени 'YYYY-MM-DD HH:MM:SS', кэшированная в пределах секунды"""
+        now = int(time.time())
+        if now != self._ts_cache_second:
+            self._ts_cache_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+            self._ts_cache_second = now
+        return self._ts_cache_str
+
     def add_nav_record(self, nav: float) -> None:
         """Добавление записи NAV"""
-        record = NavRecord(
-            date=time.strftime('%Y-%m-%d %H:%M:%S'),
-            nav=nav
-        )
-        self.nav_history.append(record)
+        # Сырой epoch в кольцо; текстовая дата форматируется лениво при дампе
+        self._nav_push(int(time.time()), nav)
+        self._dirty = True
+
+    def _rebuild_open_symbols(self) -> None:
+        """Пересборка множества открытых символов из текущих позиций"""
+        self._open_symbols = {k for k, v in self.positions.items() if abs(v) > 1e-8}
 
     def update_positions(self, new_positions: Dict[str, float]) -> None:
         """Обновление позиций"""
         self.positions.update(new_positions)
+        # Инкрементально поддерживаем множество открытых символов:
+        # get_open_positions обходится без abs-фильтра по всему словарю
+        open_symbols = self._open_symbols
+        for symbol, size in new_positions.items():
+            if abs(size) > 1e-8:
+                open_symbols.add(symbol)
+            else:
+                open_symbols.discard(symbol)
+        self._dirty = True
 
     def add_funding_rates(self, funding_rates: Dict[str, float]) -> None:
         """Добавление ставок фандинга"""
         for symbol, rate in funding_rates.items():
-            if symbol in self.funding_history:
-                self.funding_history[symbol].append(rate)
+            buf = self._funding_buf.get(symbol)
+            if buf is None:
+                continue
+            n = self._funding_len[symbol]
+            if n == buf.size:
+                # Геометрический рост: амортизированная O(1) вставка
+                buf = np.resize(buf, max(8, buf.size * 2))
+                self._funding_buf[symbol] = buf
+            buf[n] = rate
+            self._funding_len[symbol] = n + 1
+            self._dirty = True
+
+    def get_funding_rates_array(self, symbol: str) -> np.ndarray:
+        """Ставки фандинга символа одним массивом (view на заполненную часть)"""
+        buf = self._funding_buf.get(symbol)
+        if buf is None:
+            return np.empty(0, dtype=np.float64)
+        return buf[:self._funding_len[symbol]]
 
     def add_commission_record(self, symbol: str, side: str, size: float, price: float,
                               commission: Optional[float] = None, commission_token: Optional[str] = None,
@@ -202,7 +415,7 @@ class StateManager:
                               nav_after_commission: float = 0.0) -> None:
         """Добавление записи комиссии"""
         record = CommissionRecord(
-            date=time.strftime('%Y-%m-%d %H:%M:%S'),
+            date=self._format_timestamp(),
             symbol=symbol,
             side=side,
             size=size,
@@ -214,6 +427,10 @@ class StateManager:
             nav_after_commission=nav_after_commission
         )
         self.commission_history.append(record)
+        self._append_sidecar('_commission_fp', self.commission_sidecar, record)
+        if commission_usd:
+            self._total_commission_usd += commission_usd
+        self._dirty = True
 
     def add_funding_records(self, records: List[dict]) -> None:
         """Добавление записей фандинга"""
@@ -226,44 +443,46 @@ class StateManager:
                 endTime=record.get('endTime', 0)
             )
             self.funding_paid_history.append(funding_record)
+            self._append_sidecar('_funding_fp', self.funding_sidecar, funding_record)
+            if funding_record.funding_usd:
+                self._total_funding_usd += funding_record.funding_usd
+            if funding_record.endTime > self._max_funding_end_time:
+                self._max_funding_end_time = funding_record.endTime
+            self._dirty = True
 
     def get_last_nav(self) -> float:
         """Получение последнего NAV"""
-        return self.nav_history[-1].nav if self.nav_history else self.config.get('start_nav', 100.0)
+        if not self._nav_len:
+            return self.config.get('start_nav', 100.0)
+        return float(self._nav_val[(self._nav_head - 1) % _NAV_RETENTION])
 
     def get_open_positions(self) -> Dict[str, float]:
         """Получение открытых позиций (с ненулевыми значениями)"""
-        return {k: v for k, v in self.positions.items() if abs(v) > 1e-8}
+        positions = self.positions
+        return {s: positions[s] for s in self._open_symbols}
 
     def get_last_funding_time(self) -> int:
-        """Получение времени последней записи фандинга"""
-        if not self.funding_paid_history:
-            return 0
-        return max([rec.endTime for rec in self.funding_paid_history])
+        """Получение времени последней записи фандинга (бегущий максимум, O(1))"""
+        return self._max_funding_end_time
 
     def get_total_commission_usd(self) -> float:
-        """Получение общей суммы комиссий в USD"""
-        total = 0.0
-        for record in self.commission_history:
-            if record.commission_usd:
-                total += record.commission_usd
-        return total
+        """Получение общей суммы комиссий в USD (бегущая сумма, O(1))"""
+        return self._total_commission_usd
 
     def get_total_funding_usd(self) -> float:
-        """Получение общей суммы фандинга в USD"""
-        total = 0.0
-        for record in self.funding_paid_history:
-            if record.funding_usd:
-                total += record.funding_usd
-        return total
+        """Получение общей суммы фандинга в USD (бегущая сумма, O(1))"""
+        return self._total_funding_usd
 
     def get_summary(self) -> Dict[str, Any]:
         """Получение сводки состояния"""
         return {
             'current_nav': self.get_last_nav(),
             'open_positions': self.get_open_positions(),
-            'total_records': len(self.nav_history),
+            'total_records': self._nav_len,
             'total_commission_usd': self.get_total_commission_usd(),
             'total_funding_usd': self.get_total_funding_usd(),
-            'last_update': self.nav_history[-1].date if self.nav_history else 'Never'
+            'last_update': time.strftime(
+                '%Y-%m-%d %H:%M:%S',
+                time.localtime(int(self._nav_ts[(self._nav_head - 1) % _NAV_RETENTION]))
+            ) if self._nav_len else 'Never'
         }
@@ -3,9 +3,13 @@
 Использует новую модульную архитектуру с инжекцией зависимостей
 """
 
+import time
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+
+import numpy as np
 from logger_config import setup_unified_logger
+from config_manager import ConfigManager
 from interfaces import (
     IMarketDataProvider, 
     IPositionProvider, 
@@ -40,6 +44,13 @@ class PortfolioState:
     position_ratio: float  # Рассчитывается как btc_margin / shorts_margin
     margin_usage_percent: float
     available_balance: float
+    # Цены, полученные при сборе состояния: ребалансировка в том же цикле
+    # использует их повторно вместо второго запроса к API
+    prices: Dict[str, float] = None
+    # SoA-проекция шортов: параллельные колонки символов и размеров —
+    # потребители делают векторную математику без hash-lookup'ов по словарю
+    shorts_symbols: Tuple[str, ...] = ()
+    shorts_sizes: np.ndarray = None
 
 class LongShortStrategy:
     """
@@ -54,6 +65,7 @@ class LongShortStrategy:
         order_executor: IOrderExecutor,
         performance_monitor: IPerformanceMonitor,
         risk_manager: Optional[IRiskManager] = None,
+        config_manager: Optional[ConfigManager] = None,
         ratio_target: float = 2.0,
         ratio_low: float = 1.8,
         ratio_high: float = 2.2,
@@ -68,13 +80,31 @@ class LongShortStrategy:
         self.order_executor = order_executor
         self.performance_monitor = performance_monitor
         self.risk_manager = risk_manager
-        
+        self._config_manager = config_manager
+
         # Параметры стратегии
         self.ratio_target = ratio_target
         self.ratio_low = ratio_low
         self.ratio_high = ratio_high
         self.reserve_percent = reserve_percent
         self.shorts_symbols = shorts_symbols if shorts_symbols is not None else ["ZK", "STRK"]
+        # Frozenset для O(1) проверок принадлежности в горячем цикле
+        # (list дает O(k) линейный скан на каждую позицию)
+        self._shorts_set = frozenset(self.shorts_symbols)
+        # Неизменяемый полный список символов: собирается один раз вместо
+        # конкатенации ["BTC"] + shorts на каждый запрос цен
+        self._all_symbols: Tuple[str, ...] = ("BTC", *self.shorts_symbols)
+
+        # Весовые коэффициенты целевых позиций зависят только от ratio_target —
+        # считаем один раз, в цикле остаются только умножения
+        self._btc_weight = ratio_target / (ratio_target + 1)
+        self._shorts_weight = 1.0 / (ratio_target + 1)
+        self._inv_ratio_target = (1.0 / ratio_target) if ratio_target > 0 else 0.0
+
+        # Мемоизация проверки leverage compliance: при неизменных требованиях
+        # и недавнем успешном результате сетевая проверка пропускается
+        self._compliance_key: Optional[Tuple] = None
+        self._compliance_ok_ts = 0.0
         
         self.logger.info(f"[INIT] Strategy initialized - Target ratio: {ratio_target}, Reserve: {reserve_percent:.1%}")
     
@@ -85,30 +115,36 @@ class LongShortStrategy:
         account_summary = self.position_provider.get_account_summary()
         
         # Получаем цены
-        all_symbols = ["BTC"] + self.shorts_symbols
-        prices = self.market_data.get_prices(all_symbols)
+        prices = self.market_data.get_prices(self._all_symbols)
         
         # Рассчитываем стоимости позиций
         btc_position = positions.get("BTC", 0.0)
         btc_value_usd = btc_position * prices.get("BTC", 0.0)
-        
-        shorts_positions = {symbol: positions.get(symbol, 0.0) for symbol in self.shorts_symbols}
-        shorts_value_usd = sum(
-            abs(pos) * prices.get(symbol, 0.0) 
-            for symbol, pos in shorts_positions.items()
-        )
-        
+
+        # Один проход по шортам: словарь позиций, колонка размеров
+        # и суммарная стоимость собираются вместе
+        shorts_positions = {}
+        shorts_sizes = np.empty(len(self.shorts_symbols), dtype=np.float64)
+        shorts_value_usd = 0.0
+        for i, symbol in enumerate(self.shorts_symbols):
+            pos = positions.get(symbol, 0.0)
+            shorts_positions[symbol] = pos
+            shorts_sizes[i] = pos
+            shorts_value_usd += abs(pos) * prices.get(symbol, 0.0)
+
         # Получаем детальную информацию о позициях для расчета margin
         position_details = self.position_provider.get_position_details()
-        
-        # Рассчитываем margin для BTC и шортов
+
+        # Рассчитываем margin для BTC и шортов за один проход,
+        # принадлежность шортам — O(1) через frozenset
         btc_margin = 0.0
         shorts_margin = 0.0
-        
+        shorts_set = self._shorts_set
+
         for pos_info in position_details:
             if pos_info.symbol == "BTC":
                 btc_margin += pos_info.margin_used
-            elif pos_info.symbol in self.shorts_symbols:
+            elif pos_info.symbol in shorts_set:
                 shorts_margin += pos_info.margin_used
         
         # Рассчитываем метрики
@@ -129,7 +165,10 @@ class LongShortStrategy:
             shorts_margin=shorts_margin,
             position_ratio=position_ratio,
             margin_usage_percent=margin_usage_percent,
-            available_balance=nav - margin_used
+            available_balance=nav - margin_used,
+            prices=prices,
+            shorts_symbols=self._all_symbols[1:],
+            shorts_sizes=shorts_sizes
         )
     
     def calculate_rebalance_decision(self, portfolio: PortfolioState) -> RebalanceDecision:
@@ -137,20 +176,18 @@ class LongShortStrategy:
         # Рассчитываем доступные средства для торговли
         available_for_trading = portfolio.nav * (1.0 - self.reserve_percent)
         
-        # Целевые размеры позиций
+        # Целевые размеры позиций (веса предрассчитаны в __init__)
         total_target = available_for_trading
-        btc_target_usd = total_target * self.ratio_target / (self.ratio_target + 1)
-        shorts_target_usd = total_target * 1 / (self.ratio_target + 1)
+        btc_target_usd = total_target * self._btc_weight
+        shorts_target_usd = total_target * self._shorts_weight
         
         # Проверка границ ratio для ребалансировки
         current_ratio = portfolio.position_ratio
         should_rebalance = current_ratio < self.ratio_low or current_ratio > self.ratio_high
         
         # Рассчитываем процентное отклонение для логирования
-        if self.ratio_target > 0:
-            deviation_percent = abs(current_ratio - self.ratio_target) / self.ratio_target
-        else:
-            deviation_percent = 0.0
+        # (обратная величина предрассчитана, деление заменено умножением)
+        deviation_percent = abs(current_ratio - self.ratio_target) * self._inv_ratio_target
         
         reason = ""
         if should_rebalance:
@@ -180,8 +217,15 @@ class LongShortStrategy:
         self.logger.info(f"[REBALANCE] Target - BTC: ${decision.btc_target_usd:.2f}, Shorts: ${decision.shorts_target_usd:.2f}")
         
         success = True
-        prices = self.market_data.get_prices(["BTC"] + self.shorts_symbols)
-        
+        # Цены уже получены при сборе состояния портфеля в этом же цикле —
+        # повторный запрос к API не нужен
+        prices = portfolio.prices or self.market_data.get_prices(self._all_symbols)
+
+        # Сначала собираем весь план ордеров (symbol, is_buy, size, price),
+        # затем отправляем его одним батчевым запросом: одна подпись и один
+        # round-trip вместо последовательных вызовов по каждой ноге
+        order_plan: List[Tuple[str, bool, float, float]] = []
+
         # Ребалансировка BTC
         btc_diff_usd = decision.btc_target_usd - decision.btc_current_usd
         if abs(btc_diff_usd) > 5.0:  # Минимальный порог $5
@@ -192,51 +236,44 @@ class LongShortStrategy:
             else:
                 btc_size_diff = btc_diff_usd / btc_price
                 is_buy = btc_size_diff > 0
-                
-                result = self.order_executor.place_market_order(
-                    "BTC", is_buy, abs(btc_size_diff), btc_price
-                )
-            
-                if result.success:
-                    self.logger.info(f"[REBALANCE] BTC order successful: {'BUY' if is_buy else 'SELL'} {abs(btc_size_diff):.6f}")
-                    self.performance_monitor.track_order_placed()
-                else:
-                    self.logger.error(f"[REBALANCE] BTC order failed: {result.error_message}")
-                    success = False
-        
+                self.logger.info(f"[REBALANCE] BTC: {'BUY' if is_buy else 'SELL'} {abs(btc_size_diff):.6f} @ ${btc_price:.4f}")
+                order_plan.append(("BTC", is_buy, abs(btc_size_diff), btc_price))
+
         # Ребалансировка шортов
         shorts_diff_usd = decision.shorts_target_usd - decision.shorts_current_usd
         if abs(shorts_diff_usd) > 5.0:  # Минимальный порог $5
             self.logger.info(f"[REBALANCE] Shorts adjustment needed: ${shorts_diff_usd:.2f}")
-            
+
             # Получаем текущие позиции шортов
             current_shorts = portfolio.shorts_positions
-            
+
             # Рассчитываем целевые позиции для каждого символа
             target_shorts_per_symbol = decision.shorts_target_usd / len(self.shorts_symbols)
-            
+
             for symbol in self.shorts_symbols:
                 symbol_price = prices.get(symbol, 0.0)
                 if symbol_price == 0:
                     self.logger.warning(f"[REBALANCE] No price for {symbol}, skipping")
                     continue
-                
+
                 # Текущая позиция в USD (отрицательная для шортов)
                 current_position_size = current_shorts.get(symbol, 0.0)
                 current_position_usd = abs(current_position_size) * symbol_price
-                
+
                 # Целевая позиция в USD (всегда положительная величина)
                 target_position_usd = target_shorts_per_symbol
-                
+
                 # Разница в USD
                 position_diff_usd = target_position_usd - current_position_usd
-                
-                self.logger.debug(f"[REBALANCE] {symbol}: Current ${current_position_usd:.2f}, Target ${target_position_usd:.2f}, Diff ${position_diff_usd:.2f}")
-                
+
+                self.logger.debug(
+                    "[REBALANCE] %s: Current $%.2f, Target $%.2f, Diff $%.2f",
+                    symbol, current_position_usd, target_position_usd, position_diff_usd)
+
                 if abs(position_diff_usd) > 2.0:  # Минимальный порог $2 на символ
                     # Рассчитываем размер ордера
                     order_size = abs(position_diff_usd) / symbol_price
-                    
+
                     # Определяем направление ордера
                     if position_diff_usd > 0:
                         # Нужно увеличить шорт позицию (продать больше)
@@ -246,21 +283,22 @@ class LongShortStrategy:
                         # Нужно уменьшить шорт позицию (купить обратно)
                         is_buy = True
                         action = "BUY"
-                    
-                    self.logger.info(f"[REBALANCE] {symbol}: {action} {order_size:.6f} @ ${symbol_price:.4f}")
-                    
-                    result = self.order_executor.place_market_order(
-                        symbol, is_buy, order_size, symbol_price
-                    )
-                    
-                    if result.success:
-                        self.logger.info(f"[REBALANCE] {symbol} order successful: {action} {order_size:.6f}")
-                        self.performance_monitor.track_order_placed()
-                    else:
-                        self.logger.error(f"[REBALANCE] {symbol} order failed: {result.error_message}")
-                        success = False
+
+                    self.logger.info("[REBALANCE] %s: %s %.6f @ $%.4f", symbol, action, order_size, symbol_price)
+                    order_plan.append((symbol, is_buy, order_size, symbol_price))
                 else:
-                    self.logger.debug(f"[REBALANCE] {symbol}: No adjustment needed (${position_diff_usd:.2f})")
+                    self.logger.debug("[REBALANCE] %s: No adjustment needed ($%.2f)", symbol, position_diff_usd)
+
+        # Отправляем план одним батчем
+        if order_plan:
+            results = self.order_executor.place_market_orders_batch(order_plan)
+            for symbol, result in results.items():
+                if result.success:
+                    self.logger.info(f"[REBALANCE] {symbol} order successful")
+                    self.performance_monitor.track_order_placed()
+                else:
+                    self.logger.error(f"[REBALANCE] {symbol} order failed: {result.error_message}")
+                    success = False
         
         if success:
             self.performance_monitor.track_rebalance_executed()
@@ -281,24 +319,37 @@ class LongShortStrategy:
             self.performance_monitor.track_pnl(total_unrealized, 0.0)  # Realized = 0 для простоты
             
             # Проверяем, включена ли ребалансировка
-            from config_manager import ConfigManager
-            config = ConfigManager()
-            
+            config = self._config_manager
+            if config is None:
+                # Фолбэк для вызовов без инжекции: конструируем один раз,
+                # а не перечитываем config.json на каждом цикле
+                config = self._config_manager = ConfigManager()
+
             if not config.rebalance_enabled:
                 self.logger.info("[STRATEGY] Rebalancing is disabled in config")
                 return True
             
-            # Проверяем и исправляем leverage compliance ПЕРЕД ребалансировкой
-            if self.risk_manager:
+            # Проверяем и исправляем leverage compliance ПЕРЕД ребалансировкой.
+            # Стационарный случай — требования не изменились и недавняя
+            # проверка прошла — обходится сравнением ключа без сетевого вызова
+            compliance_key = (config.leverage_btc, config.leverage_shorts, tuple(config.shorts))
+            compliance_fresh = (
+                compliance_key == self._compliance_key and
+                time.monotonic() - self._compliance_ok_ts < 60.0
+            )
+            if self.risk_manager and not compliance_fresh:
                 try:
                     compliance = self.risk_manager.check_leverage_compliance(
                         config.leverage_btc,
                         config.leverage_shorts,
                         config.shorts
                     )
-                    
+
                     non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
-                    if non_compliant:
+                    if not non_compliant:
+                        self._compliance_key = compliance_key
+                        self._compliance_ok_ts = time.monotonic()
+                    else:
                         self.logger.warning(f"[STRATEGY] ⚠️  LEVERAGE NON-COMPLIANCE DETECTED: {non_compliant}")
                         self.logger.warning("[STRATEGY] 🔄 INITIATING FULL RESET: All positions will be closed and reopened!")
                         self.logger.info("[STRATEGY] This process will: 1) Close ALL positions 2) Set correct leverages 3) Reopen positions")
@@ -325,8 +376,14 @@ class LongShortStrategy:
             decision = self.calculate_rebalance_decision(portfolio)
             
             # Логируем состояние
-            self.logger.debug(f"[STRATEGY] NAV: ${portfolio.nav:.2f}, Ratio: {portfolio.position_ratio:.2f} (target: {self.ratio_target:.2f})")
-            self.logger.debug(f"[STRATEGY] Boundaries: [{self.ratio_low:.2f}, {self.ratio_high:.2f}], Deviation: {decision.deviation_percent:.1%}")
+            # %-style аргументы: форматирование выполняется только если
+            # DEBUG реально включен, на INFO строки не собираются вовсе
+            self.logger.debug(
+                "[STRATEGY] NAV: $%.2f, Ratio: %.2f (target: %.2f)",
+                portfolio.nav, portfolio.position_ratio, self.ratio_target)
+            self.logger.debug(
+                "[STRATEGY] Boundaries: [%.2f, %.2f], Deviation: %.1f%%",
+                self.ratio_low, self.ratio_high, decision.deviation_percent * 100)
             
             # Выполняем ребалансировку если необходимо
             if decision.should_rebalance:
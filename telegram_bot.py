@@ -1,4 +1,8 @@
-import json
+import os
+import json_utils
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Headless-рендер без GUI-бэкенда и его инициализации
 import matplotlib.pyplot as plt
 from io import BytesIO
 from aiogram import Bot, Dispatcher
@@ -17,8 +21,7 @@ import subprocess
 
 # Загрузка конфигурации
 try:
-    with open('config.json') as f:
-        config = json.load(f)
+    config = json_utils.load_file('config.json')
     TELEGRAM_TOKEN = config.get('telegram_token')
     TELEGRAM_CHAT_ID = config.get('telegram_chat_id')
     account_address = config.get('account_address')
@@ -26,14 +29,20 @@ try:
 
     if not all([TELEGRAM_TOKEN, account_address, secret_key]):
         raise ValueError("Missing required config fields for Telegram bot")
-except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
+except (FileNotFoundError, json_utils.JSONDecodeError, ValueError) as e:
     print(f"❌ Config error: {e}")
     exit(1)
 wallet = Account.from_key(secret_key)
 
 # Инициализация Hyperliquid SDK
+from network_utils import mount_shared_session
+
 info = Info(MAINNET_API_URL, skip_ws=True)
 exchange = Exchange(wallet, base_url=MAINNET_API_URL, account_address=account_address)
+# Оба клиента делят один пул keep-alive соединений: без TLS handshake
+# на каждый запрос /status и /closeall
+mount_shared_session(info)
+mount_shared_session(exchange)
 
 trader_process = None
 
@@ -52,14 +61,26 @@ async def unauthorized_handler(message: Message):
     return
 
 
-def load_state():
-    with open('state.json') as f:
-        return json.load(f)
+# Кэш распарсенного state.json по mtime файла: повторный /status или /plot
+# без изменений на диске обходится одним stat вместо чтения и парсинга.
+# Хендлеры aiogram работают в одном потоке loop'а — блокировка не нужна
+_state_cache = {'mtime': 0, 'data': None}
+
+
+def load_state(path='state.json'):
+    mtime = os.stat(path).st_mtime_ns
+    if mtime == _state_cache['mtime'] and _state_cache['data'] is not None:
+        return _state_cache['data']
+    data = json_utils.load_file(path)
+    _state_cache['mtime'] = mtime
+    _state_cache['data'] = data
+    return data
 
 
 def save_state(state, path='state.json'):
-    with open(path, 'w') as f:
-        json.dump(state, f, indent=2)
+    # Атомарная запись через orjson-бэкенд: tmp-файл + os.replace,
+    # обрезанного state.json не бывает даже при падении посреди записи
+    json_utils.dump_file(state, path, atomic=True)
 
 
 async def status(message: Message):
@@ -74,26 +95,86 @@ async def status(message: Message):
     await message.answer(msg)
 
 
+# Больше точек на 1000px-картинке неразличимо — длинную историю прореживаем
+_PLOT_MAX_POINTS = 2000
+
+
+def _lttb_indices(ys: np.ndarray, n_out: int) -> np.ndarray:
+    """Индексы точек по LTTB (Largest-Triangle-Three-Buckets).
+
+    Сохраняет визуальную форму кривой при прореживании: в каждой корзине
+    остается точка с максимальной площадью треугольника между предыдущей
+    выбранной точкой и центром следующей корзины. X — равномерные индексы
+    (записи NAV идут с фиксированным шагом)
+    """
+    n = ys.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xs = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if hi <= lo:
+            hi = lo + 1
+        if i + 2 < n_out - 1:
+            nlo, nhi = edges[i + 1], edges[i + 2]
+        else:
+            nlo, nhi = edges[i + 1], n
+        if nhi <= nlo:
+            nhi = nlo + 1
+        avg_x = xs[nlo:nhi].mean()
+        avg_y = ys[nlo:nhi].mean()
+
+        bx = xs[lo:hi]
+        by = ys[lo:hi]
+        areas = np.abs((xs[a] - avg_x) * (by - ys[a]) - (xs[a] - bx) * (avg_y - ys[a]))
+        a = lo + int(areas.argmax())
+        out[i + 1] = a
+    return out
+
+
+# Одна переиспользуемая фигура на все /plot: создание Figure/Axes/рендерера —
+# доминирующая цена для маленького графика, ax.clear() между вызовами дешевле.
+# Фигура общая, поэтому конкурентные запросы сериализуются локом
+_fig, _ax = plt.subplots(figsize=(10, 5))
+_plot_lock = asyncio.Lock()
+
+
 async def plot(message: Message):
     state = load_state()
     nav_hist = state['nav_history']
     if not nav_hist:
         await message.answer('Нет данных для графика.')
         return
-    dates = [x['date'] for x in nav_hist]
-    navs = [x['nav'] for x in nav_hist]
-    plt.figure(figsize=(10, 5))
-    plt.plot(dates, navs, label='NAV')
-    plt.title('NAV History')
-    plt.xlabel('Date')
-    plt.ylabel('NAV')
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
+    navs = np.fromiter((x['nav'] for x in nav_hist), dtype=np.float64, count=len(nav_hist))
+    if navs.size > _PLOT_MAX_POINTS:
+        # Прореживание до визуально идентичной кривой: Agg рендерит
+        # ~2000 сегментов вместо десятков тысяч
+        keep = _lttb_indices(navs, _PLOT_MAX_POINTS)
+        dates = [nav_hist[i]['date'] for i in keep]
+        navs = navs[keep]
+    else:
+        dates = [x['date'] for x in nav_hist]
     buf = BytesIO()
-    plt.savefig(buf, format='png')
+    async with _plot_lock:
+        _ax.clear()
+        _ax.plot(dates, navs, label='NAV')
+        _ax.set_title('NAV History')
+        _ax.set_xlabel('Date')
+        _ax.set_ylabel('NAV')
+        _ax.grid(True)
+        _ax.legend()
+        _fig.tight_layout()
+        # PNG-энкодинг — CPU-bound, уводим в пул потоков, чтобы не блокировать loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: _fig.savefig(buf, format='png'))
     buf.seek(0)
-    plt.close()
     await message.answer_photo(photo=buf)
 
 
@@ -103,20 +184,38 @@ async def rebalance(message: Message):
 
 async def closeall(message: Message):
     try:
-        user_state = info.user_state(account_address)
+        loop = asyncio.get_running_loop()
+        # Синхронный SDK уводим в пул потоков: HTTP round-trip не блокирует
+        # event loop и другие хендлеры продолжают обрабатываться
+        user_state = await loop.run_in_executor(None, info.user_state, account_address)
         positions = user_state.get('assetPositions', [])
-        closed = []
+
+        to_close = []
         for pos in positions:
             item = pos['position']
             coin = item['coin']
             szi = float(item['szi'])
             if abs(szi) > 1e-8:
-                resp = exchange.market_close(coin)
-                closed.append(f"{coin}: {szi} -> close resp: {resp.get('status','?')}")
-        if closed:
-            await message.answer('Закрыты позиции:\n' + '\n'.join(closed))
-        else:
+                to_close.append((coin, szi))
+
+        if not to_close:
             await message.answer('Нет открытых позиций для закрытия.')
+            return
+
+        # Закрытия выполняются конкурентно: суммарное время ~1 round-trip
+        # вместо последовательных N
+        responses = await asyncio.gather(
+            *(loop.run_in_executor(None, exchange.market_close, coin) for coin, _ in to_close),
+            return_exceptions=True
+        )
+
+        closed = []
+        for (coin, szi), resp in zip(to_close, responses):
+            if isinstance(resp, Exception):
+                closed.append(f"{coin}: {szi} -> error: {resp}")
+            else:
+                closed.append(f"{coin}: {szi} -> close resp: {resp.get('status', '?')}")
+        await message.answer('Закрыты позиции:\n' + '\n'.join(closed))
     except Exception as e:
         await message.answer(f'Ошибка при закрытии позиций: {e}')
 
@@ -127,7 +226,20 @@ async def starttrader(message: Message):
         await message.answer("Трейдер уже запущен.")
         return
     try:
-        trader_process = subprocess.Popen(['python3', 'main.py'])
+        # close_fds не дает ребенку унаследовать TLS-сокеты бота,
+        # start_new_session выводит его из группы процессов — Ctrl+C по боту
+        # трейдер не убивает; без preexec_fn CPython идет быстрым
+        # posix_spawn-путем вместо fork+exec. Сам spawn — в пул потоков,
+        # чтобы exec в ядре не блокировал event loop
+        trader_process = await asyncio.to_thread(
+            subprocess.Popen,
+            ['python3', 'main.py'],
+            close_fds=True,
+            start_new_session=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
         await message.answer(f"Трейдер запущен! PID: {trader_process.pid}")
     except Exception as e:
         await message.answer(f"Ошибка запуска трейдера: {e}")
@@ -174,8 +286,50 @@ async def main():
     dp.message.register(myid, Command('myid'))
     dp.message.register(starttrader, Command('starttrader'))
     dp.message.register(echo)
-    logger.info("Старт polling...")
-    await dp.start_polling(bot)
+
+    webhook_url = config.get('telegram_webhook_url')
+    if webhook_url:
+        # Webhook-режим: Telegram пушит апдейты по одному keep-alive
+        # TLS-соединению — ноль холостых getUpdates-запросов в простое
+        from aiohttp import web
+        from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+        webhook_path = '/tg'
+        webhook_port = int(config.get('telegram_webhook_port', 8080))
+        await bot.set_webhook(url=webhook_url.rstrip('/') + webhook_path)
+
+        app = web.Application()
+        SimpleRequestHandler(dispatcher=dp, bot=bot).register(app, path=webhook_path)
+        setup_application(app, dp, bot=bot)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, port=webhook_port)
+        await site.start()
+        logger.info("Webhook server started on port %s", webhook_port)
+        # Держим процесс живым до остановки извне
+        await asyncio.Event().wait()
+    else:
+        # Без публичного URL остаемся на long-poll
+        logger.info("Старт polling...")
+        await dp.start_polling(bot)
+
+def _install_fast_event_loop() -> bool:
+    """Опциональная ускоренная политика event loop (best-effort).
+
+    Бот целиком I/O-bound: быстрый loop снижает накладные расходы на
+    syscall'ы при long-poll и всплесках исходящих запросов. Политика
+    ставится до создания loop; без установленного uvloop — стандартный
+    asyncio без каких-либо изменений
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
 
 if __name__ == '__main__':
+    _install_fast_event_loop()
     asyncio.run(main())
@@ -6,7 +6,11 @@
 import time
 import signal
 import sys
-import traceback
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
 from typing import Dict
 from logger_config import setup_unified_logger, log_session_end
 from config_manager import ConfigManager
@@ -24,6 +28,27 @@ from strategy import LongShortStrategy
 from asset_metadata import get_asset_metadata_provider
 
 
+@contextmanager
+def _track_operation(monitor, operation: str):
+    """Учет латентности и успешности операции.
+
+    Модульный contextmanager вместо класса, определяемого внутри метода:
+    никакой пересборки type-объекта на каждый цикл; perf_counter дает
+    монотонные метки с максимальным разрешением
+    """
+    start = time.perf_counter()
+    success = True
+    try:
+        yield
+    except BaseException:
+        success = False
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        monitor.track_latency(operation, duration)
+        monitor.track_success_rate(operation, success)
+
+
 class HyperliquidTrader:
     """Трейдер с модульной архитектурой"""
 
@@ -32,7 +57,13 @@ class HyperliquidTrader:
         self.logger.info('=== Hyperliquid Trader Starting ===')
 
         self.running = False
+        # Событие остановки: пауза между циклами — одно блокирующее ожидание,
+        # которое сигнал снимает мгновенно, без посекундных пробуждений
+        self._stop_event = threading.Event()
         self.config_path = config_path
+        # Последний собранный статус портфеля: (монотонная метка, dict).
+        # Меню рендерит из него без повторного похода на биржу, пока он свеж
+        self._last_snapshot = (0.0, None)
 
         try:
             # Инициализация базовых компонентов
@@ -69,6 +100,7 @@ class HyperliquidTrader:
                 order_executor=self.order_executor,
                 performance_monitor=self.performance_monitor,
                 risk_manager=self.risk_manager,
+                config_manager=self.config_manager,
                 ratio_target=self.config_manager.ratio_target,
                 ratio_low=self.config_manager.ratio_low,
                 ratio_high=self.config_manager.ratio_high,
@@ -83,78 +115,59 @@ class HyperliquidTrader:
             self.logger.info('=== Components initialized successfully ===')
 
         except Exception as e:
-            self.logger.error(f'FATAL: Initialization failed: {e}')
-            self.logger.error(traceback.format_exc())
+            self.logger.exception('FATAL: Initialization failed: %s', e)
             sys.exit(1)
 
     def _signal_handler(self, signum, frame):
         """Обработка сигналов для graceful shutdown"""
-        self.logger.info(f'🛑 Signal {signum} received, shutting down gracefully...')
+        self.logger.info('🛑 Signal %s received, shutting down gracefully...', signum)
         self.running = False
+        self._stop_event.set()
         self.logger.info('⏳ Please wait for current operations to complete...')
 
     def run_trading_cycle(self) -> bool:
         """Выполнение одного цикла торговли"""
-        cycle_start = time.time()
+        cycle_start = time.monotonic()
 
         try:
             self.logger.info('--- Starting trading cycle ---')
 
             # Отслеживаем время выполнения цикла
-            with self._track_operation("trading_cycle"):
+            with _track_operation(self.performance_monitor, "trading_cycle"):
                 success = self.strategy.run_strategy_cycle()
 
-            # Сохраняем состояние
-            self.state_manager.save_state()
+            # Сохраняем состояние (дебаунс: реальная запись не чаще раза в 5с)
+            self.state_manager.maybe_save()
 
-            cycle_duration = time.time() - cycle_start
+            cycle_duration = time.monotonic() - cycle_start
             self.performance_monitor.track_latency("full_cycle", cycle_duration)
 
             if success:
-                self.logger.info(f'Trading cycle completed successfully in {cycle_duration:.3f}s')
+                self.logger.info('Trading cycle completed successfully in %.3fs', cycle_duration)
             else:
-                self.logger.error(f'Trading cycle failed after {cycle_duration:.3f}s')
+                self.logger.error('Trading cycle failed after %.3fs', cycle_duration)
 
             return success
 
         except Exception as e:
-            cycle_duration = time.time() - cycle_start
-            self.logger.error(f'Trading cycle exception after {cycle_duration:.3f}s: {e}')
-            self.logger.error(traceback.format_exc())
+            cycle_duration = time.monotonic() - cycle_start
+            # logger.exception форматирует traceback один раз и лениво —
+            # только если обработчик реально пишет запись
+            self.logger.exception('Trading cycle exception after %.3fs', cycle_duration)
             self.performance_monitor.track_success_rate("trading_cycle", False)
             return False
 
-    def _track_operation(self, operation_name: str):
-        """Context manager для отслеживания операций"""
-        class OperationTracker:
-            def __init__(self, monitor, operation):
-                self.monitor = monitor
-                self.operation = operation
-                self.start_time = None
-
-            def __enter__(self):
-                self.start_time = time.time()
-                return self
-
-            def __exit__(self, exc_type, exc_val, exc_tb):
-                duration = time.time() - (self.start_time or 0.0)
-                success = exc_type is None
-                self.monitor.track_latency(self.operation, duration)
-                self.monitor.track_success_rate(self.operation, success)
-
-        return OperationTracker(self.performance_monitor, operation_name)
-
     def run_main_loop(self, sleep_duration: int = 300) -> None:
         """Основной цикл работы трейдера"""
         self.running = True
         cycle_count = 0
 
-        self.logger.info(f'Starting main loop with {sleep_duration}s intervals')
+        self.logger.info('Starting main loop with %ss intervals', sleep_duration)
 
         try:
             while self.running:
                 cycle_count += 1
-                self.logger.info(f'=== Cycle #{cycle_count} ===')
+                self.logger.info('=== Cycle #%d ===', cycle_count)
 
                 # Выполняем цикл торговли
                 success = self.run_trading_cycle()
@@ -168,18 +181,16 @@ class HyperliquidTrader:
 
                 # Ожидание между циклами с возможностью прерывания
                 if self.running:
-                    self.logger.info(f'Sleeping for {sleep_duration}s... (Press Ctrl+C to stop)')
-                    # Разбиваем длительный sleep на короткие интервалы для возможности прерывания
-                    for i in range(sleep_duration):
-                        if not self.running:
-                            break
-                        time.sleep(1)
+                    self.logger.info('Sleeping for %ss... (Press Ctrl+C to stop)', sleep_duration)
+                    # Одно ожидание на событии вместо посекундного цикла:
+                    # сигнал будит wait немедленно, шатдаун без задержки
+                    if self._stop_event.wait(sleep_duration):
+                        break
 
         except KeyboardInterrupt:
             self.logger.info('Keyboard interrupt received')
         except Exception as e:
-            self.logger.error(f'Main loop exception: {e}')
-            self.logger.error(traceback.format_exc())
+            self.logger.exception('Main loop exception: %s', e)
         finally:
             self.cleanup()
 
@@ -202,7 +213,7 @@ class HyperliquidTrader:
             self.logger.info('=== Cleanup completed ===')
 
         except Exception as e:
-            self.logger.error(f'Cleanup error: {e}')
+            self.logger.exception('Cleanup error: %s', e)
         finally:
             log_session_end()
 
@@ -221,7 +232,7 @@ class HyperliquidTrader:
             return success
 
         except Exception as e:
-            self.logger.error(f'Error closing positions: {e}')
+            self.logger.exception('Error closing positions: %s', e)
             return False
 
     def get_portfolio_status(self) -> Dict:
@@ -230,33 +241,48 @@ class HyperliquidTrader:
             portfolio_state = self.strategy.get_portfolio_state()
             metrics = self.performance_monitor.get_metrics()
 
-            # Получаем детальную информацию о позициях и leverage
-            position_details = self.risk_manager.get_position_details_with_leverage()
-            current_leverages = self.risk_manager.get_current_leverages()
-
-            # Проверяем compliance
-            compliance = self.risk_manager.check_leverage_compliance(
-                self.config_manager.leverage_btc,
-                self.config_manager.leverage_shorts,
-                self.config_manager.shorts
-            )
-
-            # Получаем цены для расчетов
-            all_symbols = ["BTC"] + self.config_manager.shorts
-            prices = self.market_data_provider.get_prices(all_symbols)
-
-            # Рассчитываем стоимости позиций
-            btc_value = portfolio_state.btc_position * prices.get("BTC", 0.0)
-            shorts_value = sum(
-                abs(portfolio_state.shorts_positions.get(symbol, 0.0)) * prices.get(symbol, 0.0)
-                for symbol in self.config_manager.shorts
-            )
+            # Четыре независимых сетевых вызова уходят параллельно: суммарное
+            # время — максимум из round-trip'ов, а не их сумма; соединения
+            # переиспользуются через общий пул сессии
+            with ThreadPoolExecutor(max_workers=4, thread_name_prefix="status") as executor:
+                f_details = executor.submit(self.risk_manager.get_position_details_with_leverage)
+                f_leverages = executor.submit(self.risk_manager.get_current_leverages)
+                f_compliance = executor.submit(
+                    self.risk_manager.check_leverage_compliance,
+                    self.config_manager.leverage_btc,
+                    self.config_manager.leverage_shorts,
+                    self.config_manager.shorts
+                )
+                # Кортеж символов предвычислен в конфиге
+                f_prices = executor.submit(
+                    self.market_data_provider.get_prices, self.config_manager.all_symbols)
+
+                position_details = f_details.result()
+                current_leverages = f_leverages.result()
+                compliance = f_compliance.result()
+                prices = f_prices.result()
+
+            # Рассчитываем стоимости векторно: колонки размеров и цен, одна
+            # dot-редукция |size|*price вместо скалярного Python-цикла
+            btc_position = portfolio_state.btc_position
+            btc_value = btc_position * prices.get("BTC", 0.0)
+
+            # Колонка размеров уже собрана стратегией (SoA) — без повторных
+            # hash-lookup'ов по словарю позиций
+            shorts = portfolio_state.shorts_symbols
+            sizes = portfolio_state.shorts_sizes
+            prices_arr = np.fromiter(
+                (prices.get(s, 0.0) for s in shorts),
+                dtype=np.float64, count=len(shorts))
+            abs_sizes = np.abs(sizes)
+            shorts_value = float(abs_sizes.dot(prices_arr))
 
-            # Формируем открытые позиции
             open_positions = {}
-            for symbol, size in {**{"BTC": portfolio_state.btc_position}, **portfolio_state.shorts_positions}.items():
-                if abs(size) > 1e-8:
-                    open_positions[symbol] = size
+            if abs(btc_position) > 1e-8:
+                open_positions["BTC"] = btc_position
+            for symbol, size, is_open in zip(shorts, sizes, abs_sizes > 1e-8):
+                if is_open:
+                    open_positions[symbol] = float(size)
 
             status = {
                 'nav': portfolio_state.nav,
@@ -290,26 +316,29 @@ class HyperliquidTrader:
 
             # Логируем статус
             self.logger.info('=== Portfolio Status ===')
-            self.logger.info(f'NAV: ${status["nav"]:.2f}')
-            self.logger.info(f'BTC Position: {status["btc_position"]:.6f} (${status["btc_value_usd"]:.2f})')
-            self.logger.info(f'Shorts Value: ${status["shorts_value_usd"]:.2f}')
+            self.logger.info('NAV: $%.2f', status['nav'])
+            self.logger.info('BTC Position: %.6f ($%.2f)', status['btc_position'], status['btc_value_usd'])
+            self.logger.info('Shorts Value: $%.2f', status['shorts_value_usd'])
             self.logger.info(
                 f'Position Ratio (by margin): {status["position_ratio"]:.2f} (Target: {status["target_ratio"]:.2f})')
             self.logger.info(
                 f'BTC Margin: ${portfolio_state.btc_margin:.2f}, Shorts Margin: ${portfolio_state.shorts_margin:.2f}')
-            self.logger.info(f'Margin Usage: {status["margin_usage_percent"]:.1f}%')
+            self.logger.info('Margin Usage: %.1f%%', status['margin_usage_percent'])
 
             # Логируем leverage compliance
             non_compliant = [symbol for symbol, compliant in compliance.items() if not compliant]
             if non_compliant:
-                self.logger.warning(f'Leverage non-compliance: {non_compliant}')
+                self.logger.warning('Leverage non-compliance: %s', non_compliant)
             else:
                 self.logger.info('All leverages compliant')
 
+            # Атомарная (одно присваивание кортежа) публикация снимка статуса
+            self._last_snapshot = (time.monotonic(), status)
+
             return status
 
         except Exception as e:
-            self.logger.error(f'Error getting portfolio status: {e}')
+            self.logger.exception('Error getting portfolio status: %s', e)
             return {}
 
     def force_rebalance(self) -> bool:
@@ -335,7 +364,7 @@ class HyperliquidTrader:
             return success
 
         except Exception as e:
-            self.logger.error(f'Force rebalance error: {e}')
+            self.logger.exception('Force rebalance error: %s', e)
             return False
 
 